@@ -0,0 +1,136 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+import chess
+from typing import Optional, Tuple
+
+# Analysis of positions the bot has searched, kept between sessions
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "analysis_cache.db")
+DEFAULT_MAX_ENTRIES = 200000
+EVICTION_FRACTION = 0.1  # share of the entries dropped when the cache is full
+
+_KEY_RANGE = 1 << 64
+_SIGN_BIT = 1 << 63
+
+
+def _to_signed(key: int) -> int:
+    """SQLite integers are signed 64-bit"""
+    return key - _KEY_RANGE if key & _SIGN_BIT else key
+
+
+class AnalysisCache:
+    """Persistent store of search results: (Zobrist key, level) -> (depth, score, bound, move).
+
+    The SQLite database is opened on first use. store() only queues the result;
+    a background thread writes it, so the search never waits for the disk.
+    Once the cache holds more than max_entries, the least recently used
+    entries are evicted.
+    """
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._queue: 'queue.Queue' = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._count = 0  # rows in the database, kept up to date by the writer
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS analysis ("
+                "key INTEGER, level INTEGER, depth INTEGER, score INTEGER, bound INTEGER, "
+                "move TEXT, used REAL, PRIMARY KEY (key, level)) WITHOUT ROWID")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS analysis_used ON analysis (used)")
+            self._connection.commit()
+            self._count = self._connection.execute("SELECT COUNT(*) FROM analysis").fetchone()[0]
+            self._writer = threading.Thread(target=self._write_loop, daemon=True)
+            self._writer.start()
+        return self._connection
+
+    def probe(self, key: int, level: int) -> Optional[Tuple[int, int, int, chess.Move]]:
+        """Look up a position analysed at a difficulty level, returning (depth, score, bound, move) or None"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT depth, score, bound, move FROM analysis WHERE key = ? AND level = ?",
+                (_to_signed(key), level)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._queue.put(("touch", (time.time(), _to_signed(key), level)))
+        depth, score, bound, move = row
+        return depth, score, bound, chess.Move.from_uci(move)
+
+    def store(self, key: int, level: int, depth: int, score: int, bound: int, move: chess.Move):
+        """Queue a result; it replaces a cached one only if it was searched at least as deep"""
+        with self._lock:
+            self._connect()
+        self._queue.put(("store", (_to_signed(key), level, depth, score, bound, move.uci(), time.time())))
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            with self._lock:
+                for item in batch:
+                    if item is None:
+                        continue
+                    action, values = item
+                    if action == "store":
+                        inserted = self._connection.execute(
+                            "INSERT INTO analysis (key, level, depth, score, bound, move, used) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (key, level) DO NOTHING", values).rowcount
+                        if inserted:
+                            self._count += 1
+                        else:
+                            key, level, depth, score, bound, move, used = values
+                            self._connection.execute(
+                                "UPDATE analysis SET depth = ?, score = ?, bound = ?, move = ?, used = ? "
+                                "WHERE key = ? AND level = ? AND depth <= ?",
+                                (depth, score, bound, move, used, key, level, depth))
+                    else:
+                        self._connection.execute("UPDATE analysis SET used = ? WHERE key = ? AND level = ?", values)
+                self._evict()
+                self._connection.commit()
+            for _ in batch:
+                self._queue.task_done()
+            if None in batch:
+                return
+
+    def _evict(self):
+        """Drop the least recently used entries once the cache is over its size limit"""
+        if self._count > self.max_entries:
+            excess = self._count - self.max_entries + int(self.max_entries * EVICTION_FRACTION)
+            self._count -= self._connection.execute(
+                "DELETE FROM analysis WHERE (key, level) IN "
+                "(SELECT key, level FROM analysis ORDER BY used LIMIT ?)", (excess,)).rowcount
+
+    def __len__(self) -> int:
+        self.flush()
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM analysis").fetchone()[0]
+
+    def flush(self):
+        """Wait until all queued results are written"""
+        if self._writer:
+            self._queue.join()
+
+    def close(self):
+        """Write the queued results and close the database"""
+        if self._writer:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+        if self._connection:
+            self._connection.close()
+            self._connection = None
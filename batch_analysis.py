@@ -0,0 +1,149 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+import chess
+import chess.pgn
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from chess_engine import ChessEngine, SearchLimits, LEVELS
+
+DEFAULT_MOVETIME = 1.0  # seconds per position when no limit is given
+
+# Engine of the current worker process, built once by _init_worker
+_engine: Optional[ChessEngine] = None
+
+
+def read_fens(lines: Iterable[str]) -> Iterator[Tuple[str, Optional[str]]]:
+    """(fen, None) for every non-empty line holding a FEN or an EPD record.
+
+    EPD operations (e.g. "bm e5;") and anything else after the position are
+    ignored; EPD positions get a half-move clock of 0 and move number 1.
+    """
+    for line in lines:
+        fields = line.split()
+        if not fields:
+            continue
+        if len(fields) >= 6 and fields[4].isdigit() and fields[5].isdigit():
+            yield " ".join(fields[:6]), None
+        else:
+            yield " ".join(fields[:4]) + " 0 1", None
+
+
+def read_pgn(stream) -> Iterator[Tuple[str, Optional[str]]]:
+    """(fen, played move) for the position before every move of every game"""
+    while True:
+        game = chess.pgn.read_game(stream)
+        if game is None:
+            break
+        board = game.board()
+        for move in game.mainline_moves():
+            yield board.fen(), move.uci()
+            board.push(move)
+
+
+def _init_worker(depth: int, hash_mb: int):
+    global _engine
+    _engine = ChessEngine(depth, hash_mb=hash_mb)
+
+
+def _analyse_position(task: Tuple[int, str, Optional[str], SearchLimits]) -> Dict:
+    index, fen, played, limits = task
+    result = {"index": index, "fen": fen, "played": played, "move": None, "san": None,
+              "score": None, "depth": 0, "pv": [], "nodes": 0, "time": 0.0}
+    try:
+        board = chess.Board(fen)
+    except ValueError as e:
+        result["error"] = str(e)
+        return result
+    if not board.is_valid():
+        result["error"] = "invalid position"
+        return result
+
+    infos = []
+    start = time.perf_counter()
+    move = _engine.search(board, limits, infos.append)
+    result["time"] = round(time.perf_counter() - start, 4)
+    result["nodes"] = _engine.nodes_searched
+    if move:
+        result["move"] = move.uci()
+        result["san"] = board.san(move)
+    if infos:
+        # Scores are from the side to move's point of view
+        result["score"] = infos[-1].score
+        result["depth"] = infos[-1].depth
+        result["pv"] = [pv_move.uci() for pv_move in infos[-1].pv]
+    return result
+
+
+def analyse_positions(positions: Iterable[Tuple[str, Optional[str]]], level: str = "hard",
+                      limits: Optional[SearchLimits] = None, workers: Optional[int] = None,
+                      hash_mb: int = 16) -> Iterator[Dict]:
+    """Analyse (fen, played move) pairs on a pool of worker processes.
+
+    Every worker keeps one engine for all its positions. Results are yielded
+    in input order as soon as they and all earlier ones are done.
+    """
+    if limits is None:
+        limits = SearchLimits(movetime=DEFAULT_MOVETIME)
+    tasks = ((index, fen, played, limits) for index, (fen, played) in enumerate(positions))
+    context = multiprocessing.get_context()
+    with context.Pool(workers or os.cpu_count() or 1, _init_worker, (LEVELS[level], hash_mb)) as pool:
+        yield from pool.imap(_analyse_position, tasks)
+
+
+def format_result(result: Dict) -> str:
+    if "error" in result:
+        return f"{result['fen']}  error: {result['error']}"
+    if result["move"] is None:
+        return f"{result['fen']}  game over"
+    line = f"{result['fen']}  {result['san']}  score {result['score']}  depth {result['depth']}"
+    if result["played"]:
+        line += f"  played {result['played']}"
+    return line
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Analyse many positions in parallel")
+    parser.add_argument("inputs", nargs="*", default=["-"],
+                        help="files with one FEN or EPD record per line, or .pgn files (default: FENs on stdin)")
+    parser.add_argument("--pgn", action="store_true", help="read stdin as PGN instead of FENs")
+    parser.add_argument("--level", default="hard", choices=list(LEVELS), help="engine difficulty (default %(default)s)")
+    parser.add_argument("--movetime", type=float, help=f"seconds per position (default {DEFAULT_MOVETIME})")
+    parser.add_argument("--nodes", type=int, help="node budget per position")
+    parser.add_argument("--depth", type=int, help="search depth per position")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--hash", type=int, default=16, help="transposition table MB per worker (default %(default)s)")
+    parser.add_argument("--json", action="store_true", help="write one JSON object per line")
+    parser.add_argument("--quiet", action="store_true", help="don't report progress on stderr")
+    args = parser.parse_args(argv)
+
+    movetime = args.movetime
+    if movetime is None and args.nodes is None and args.depth is None:
+        movetime = DEFAULT_MOVETIME
+    limits = SearchLimits(depth=args.depth, movetime=movetime, nodes=args.nodes)
+
+    def positions() -> Iterator[Tuple[str, Optional[str]]]:
+        for path in args.inputs:
+            if path == "-":
+                yield from read_pgn(sys.stdin) if args.pgn else read_fens(sys.stdin)
+            else:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    yield from read_pgn(f) if path.lower().endswith(".pgn") else read_fens(f)
+
+    start = time.perf_counter()
+    count = 0
+    for result in analyse_positions(positions(), args.level, limits, args.workers, args.hash):
+        count += 1
+        print(json.dumps(result) if args.json else format_result(result), flush=True)
+        if not args.quiet:
+            elapsed = time.perf_counter() - start
+            print(f"\r{count} positions, {elapsed:.1f}s, {count / elapsed:.2f}/s", end="", file=sys.stderr, flush=True)
+    if not args.quiet:
+        print(file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+import argparse
+import json
+import sys
+import time
+import chess
+from typing import Dict, List, Optional
+from chess_engine import ChessEngine, SearchLimits, LEVELS
+from opening_trainer import OpeningTrainer
+from puzzle_mode import CHESS_PUZZLES
+
+# Fixed search depths keep node counts reproducible between runs
+DEFAULT_DEPTHS = {"easy": 2, "medium": 3, "hard": 5}
+# Allowed slowdown of nodes/sec against a baseline before the check fails
+DEFAULT_THRESHOLD = 0.10
+
+ENDGAME_POSITIONS = [
+    ("king and pawn", "8/8/8/4k3/8/8/4P3/4K3 w - - 0 1"),
+    ("rook mate", "8/8/8/4k3/8/8/8/R3K3 w - - 0 1"),
+    ("queen mate", "8/8/8/4k3/8/8/8/3QK3 w - - 0 1"),
+    ("bishop and knight mate", "8/8/8/8/8/2k5/8/KBN5 w - - 0 1"),
+    ("lucena", "1K1k4/1P6/8/8/8/8/r7/2R5 w - - 0 1"),
+    ("queen against rook", "8/8/3k4/8/8/3r4/8/Q3K3 w - - 0 1"),
+    ("fine 70", "8/k7/3p4/p2P1p2/P2P1P2/8/8/K7 w - - 0 1"),
+    ("pawn race", "8/1p6/8/8/8/8/6P1/k6K w - - 0 1"),
+]
+
+
+def get_positions() -> List[Dict]:
+    """Puzzles (after the opponent's first move), opening lines and endgames"""
+    positions = []
+    for i, puzzle in enumerate(CHESS_PUZZLES):
+        board = chess.Board(puzzle["fen"])
+        board.push_uci(puzzle["moves"][0])
+        positions.append({"name": f"puzzle {i + 1}", "category": "puzzle",
+                          "fen": board.fen(), "solution": puzzle["moves"][1]})
+    for key, opening in OpeningTrainer().openings.items():
+        board = chess.Board()
+        for move in opening["moves"]:
+            board.push_uci(move)
+        positions.append({"name": key, "category": "opening", "fen": board.fen(), "solution": None})
+    for name, fen in ENDGAME_POSITIONS:
+        positions.append({"name": name, "category": "endgame", "fen": fen, "solution": None})
+    return positions
+
+
+def run_position(level: str, position: Dict, limits: SearchLimits) -> Dict:
+    """Search one position with a fresh engine so results don't depend on the order"""
+    engine = ChessEngine(LEVELS[level])
+    iterations = []
+    start = time.perf_counter()
+    move = engine.search(chess.Board(position["fen"]), limits, iterations.append)
+    elapsed = time.perf_counter() - start
+    engine.close()
+
+    result = {
+        "category": position["category"],
+        "fen": position["fen"],
+        "move": move.uci() if move else None,
+        "depth": iterations[-1].depth if iterations else 0,
+        "score": iterations[-1].score if iterations else None,
+        "nodes": engine.nodes_searched,
+        "time": round(elapsed, 4),
+        "nps": int(engine.nodes_searched / elapsed) if elapsed > 0 else 0,
+        "time_to_depth": {str(info.depth): round(info.time, 4) for info in iterations if info.depth},
+        "qnodes": engine.stats.qnodes,
+        "tt_probes": engine.stats.tt_probes,
+        "tt_hits": engine.stats.tt_hits,
+        "tt_hit_rate": round(engine.stats.tt_hit_rate, 4),
+        "first_move_cutoff_rate": round(engine.stats.first_move_cutoff_rate, 4),
+        "effective_branching_factor": round(engine.stats.effective_branching_factor, 2),
+    }
+    if position["solution"]:
+        result["solved"] = result["move"] == position["solution"]
+    return result
+
+
+def summarize(results: Dict[str, Dict]) -> Dict:
+    """Totals and averages over the positions of one level"""
+    nodes = sum(result["nodes"] for result in results.values())
+    elapsed = sum(result["time"] for result in results.values())
+    probes = sum(result["tt_probes"] for result in results.values())
+    hits = sum(result["tt_hits"] for result in results.values())
+    puzzles = [result for result in results.values() if "solved" in result]
+
+    # Average time to complete each depth over the positions that reached it
+    depth_times: Dict[str, List[float]] = {}
+    for result in results.values():
+        for depth, seconds in result["time_to_depth"].items():
+            depth_times.setdefault(depth, []).append(seconds)
+
+    return {
+        "positions": len(results),
+        "nodes": nodes,
+        "time": round(elapsed, 4),
+        "nps": int(nodes / elapsed) if elapsed > 0 else 0,
+        "tt_hit_rate": round(hits / probes, 4) if probes else 0.0,
+        "puzzles": len(puzzles),
+        "puzzles_solved": sum(1 for result in puzzles if result["solved"]),
+        "time_to_depth": {depth: round(sum(times) / len(times), 4)
+                          for depth, times in sorted(depth_times.items(), key=lambda item: int(item[0]))},
+    }
+
+
+def run_benchmark(levels: List[str], depths: Dict[str, int], movetime: Optional[float] = None,
+                  categories: Optional[List[str]] = None, progress: bool = True) -> Dict:
+    positions = [position for position in get_positions()
+                 if categories is None or position["category"] in categories]
+    report = {"settings": {"depths": {level: depths[level] for level in levels}, "movetime": movetime},
+              "levels": {}}
+    for level in levels:
+        limits = SearchLimits(movetime=movetime) if movetime else SearchLimits(depth=depths[level])
+        results = {}
+        for i, position in enumerate(positions):
+            if progress:
+                print(f"\r{level}: {i + 1}/{len(positions)}", end="", file=sys.stderr, flush=True)
+            results[position["name"]] = run_position(level, position, limits)
+        if progress:
+            print(file=sys.stderr)
+        report["levels"][level] = {"summary": summarize(results), "positions": results}
+    return report
+
+
+def print_report(report: Dict):
+    print(f"{'level':<8} {'nodes':>10} {'time':>8} {'nps':>8} {'tt hits':>8} {'solved':>8}  time to depth")
+    for level, data in report["levels"].items():
+        summary = data["summary"]
+        depths = " ".join(f"{depth}:{seconds:.2f}s" for depth, seconds in summary["time_to_depth"].items())
+        print(f"{level:<8} {summary['nodes']:>10} {summary['time']:>8.2f} {summary['nps']:>8} "
+              f"{summary['tt_hit_rate']:>8.1%} {summary['puzzles_solved']:>4}/{summary['puzzles']:<3}  {depths}")
+
+
+def compare_to_baseline(report: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Print the changes against a baseline and return the regressions found"""
+    problems = []
+    for level, data in report["levels"].items():
+        old_data = baseline["levels"].get(level)
+        if not old_data:
+            continue
+        new, old = data["summary"], old_data["summary"]
+        print(f"{level}: nodes {old['nodes']} -> {new['nodes']}, nps {old['nps']} -> {new['nps']}, "
+              f"tt hits {old['tt_hit_rate']:.1%} -> {new['tt_hit_rate']:.1%}, "
+              f"solved {old['puzzles_solved']} -> {new['puzzles_solved']}")
+        for name, result in data["positions"].items():
+            old_result = old_data["positions"].get(name)
+            if old_result and "solved" in result and result["solved"] != old_result.get("solved"):
+                print(f"  {name}: {'now solved' if result['solved'] else 'no longer solved'} "
+                      f"({old_result['move']} -> {result['move']})")
+        if old["nps"] and new["nps"] < old["nps"] * (1 - threshold):
+            problems.append(f"{level}: {new['nps']} nps is more than {threshold:.0%} "
+                            f"below the baseline {old['nps']} nps")
+        if new["puzzles_solved"] < old["puzzles_solved"]:
+            problems.append(f"{level}: solved {new['puzzles_solved']} puzzles, "
+                            f"baseline solved {old['puzzles_solved']}")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Engine speed and strength benchmark")
+    parser.add_argument("--levels", default=",".join(LEVELS),
+                        help="comma separated difficulty levels (default %(default)s)")
+    parser.add_argument("--depth", type=int, help="search depth for every level instead of the defaults")
+    parser.add_argument("--movetime", type=float, help="seconds per position instead of a fixed depth")
+    parser.add_argument("--categories", help="comma separated subset of puzzle,opening,endgame")
+    parser.add_argument("--output", metavar="FILE", help="write the JSON report to FILE")
+    parser.add_argument("--baseline", metavar="FILE", help="compare against a saved JSON report")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed nps drop against the baseline (default %(default)s)")
+    args = parser.parse_args(argv)
+
+    levels = args.levels.split(",")
+    for level in levels:
+        if level not in LEVELS:
+            parser.error(f"unknown level {level!r}")
+    depths = {level: args.depth or DEFAULT_DEPTHS[level] for level in levels}
+    categories = args.categories.split(",") if args.categories else None
+
+    report = run_benchmark(levels, depths, args.movetime, categories)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        problems = compare_to_baseline(report, baseline, args.threshold)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,285 @@
 import chess
 import random
-from typing import Tuple, List, Dict
+from typing import Tuple, List, Dict, Optional, Callable, Iterator
 import time
+import queue
+import threading
+from transposition_table import TranspositionTable, BOUND_EXACT, BOUND_LOWER, BOUND_UPPER
+from see import static_exchange_evaluation
+from lazy_smp import HelperPool
+from search_board import SearchBoard
+from opening_book import OpeningBook
+from analysis_cache import AnalysisCache
+from mate_search import MateSearch
+
+MAX_PHASE = 24  # sum of PHASE_WEIGHTS with all minor and major pieces on board
+
+# Precomputed bitboard masks for the evaluation terms
+FILE_MASKS = [chess.BB_FILES[file] for file in range(8)]
+ADJACENT_FILE_MASKS = [
+    (chess.BB_FILES[file - 1] if file > 0 else 0) | (chess.BB_FILES[file + 1] if file < 7 else 0)
+    for file in range(8)
+]
+# Squares in front of a pawn on its own and adjacent files, indexed [color][square]
+PASSED_PAWN_MASKS = [[0] * 64, [0] * 64]
+for _square in chess.SQUARES:
+    _file = chess.square_file(_square)
+    _rank = chess.square_rank(_square)
+    _span = FILE_MASKS[_file] | ADJACENT_FILE_MASKS[_file]
+    for _r in range(8):
+        if _r > _rank:
+            PASSED_PAWN_MASKS[chess.WHITE][_square] |= _span & chess.BB_RANKS[_r]
+        elif _r < _rank:
+            PASSED_PAWN_MASKS[chess.BLACK][_square] |= _span & chess.BB_RANKS[_r]
+# Squares around the king
+KING_ZONE_MASKS = chess.BB_KING_ATTACKS
+
+# Passed pawn bonus by rank relative to the pawn's side
+PASSED_PAWN_BONUS = [0, 5, 10, 20, 35, 60, 100, 0]
+PAWN_CACHE_SIZE = 16384
+
+# Difficulty name -> ChessEngine depth argument, as in the difficulty menu
+LEVELS = {"easy": 2, "medium": 3, "hard": 4}
+
+# Search scores
+INFINITY = 100000
+MATE_SCORE = 10000
+MATE_BOUND = MATE_SCORE - 1000  # scores beyond this are mates in a known number of plies
+ASPIRATION_WINDOW = 50
+ASPIRATION_MIN_DEPTH = 3
+MAX_PLY = 64
+DELTA_MARGIN = 200
+NULL_MOVE_MIN_DEPTH = 3
+LMR_MIN_DEPTH = 3
+LMR_MIN_MOVES = 3  # moves searched at full depth before reductions start
+# Mate solver run at the root before the main search
+MATE_SEARCH_CHECKS_MOVES = 5  # longest mate looked for with checking moves only
+MATE_SEARCH_FULL_MOVES = 2  # longest mate looked for with every attacking move
+MATE_SEARCH_NODES = 20000
+
+# Deadlines and node budgets are checked every CHECK_INTERVAL nodes
+CHECK_INTERVAL = 256
+# Time management
+MOVE_OVERHEAD = 0.05  # seconds kept in reserve for move transmission and UI
+EXPECTED_GAME_LENGTH = 50  # full moves
+MIN_MOVES_TO_GO = 15
+
+class SearchLimits:
+    """Limits for one search; unset limits are unbounded.
+
+    Times are in seconds. With a clock (wtime/btime) the engine allocates its own
+    time for the move from the remaining time, increment and move number.
+    A ponder search ignores its time limits until ChessEngine.ponderhit().
+    """
+    def __init__(self, depth: Optional[int] = None, movetime: Optional[float] = None,
+                 nodes: Optional[int] = None, wtime: Optional[float] = None,
+                 btime: Optional[float] = None, winc: float = 0, binc: float = 0,
+                 movestogo: Optional[int] = None, ponder: bool = False):
+        self.depth = depth
+        self.movetime = movetime
+        self.nodes = nodes
+        self.wtime = wtime
+        self.btime = btime
+        self.winc = winc
+        self.binc = binc
+        self.movestogo = movestogo
+        self.ponder = ponder
+
+
+class SearchStats:
+    """Counters collected during one search"""
+    def __init__(self):
+        self.nodes = 0  # alpha-beta nodes
+        self.qnodes = 0  # quiescence nodes
+        self.helper_nodes = 0  # nodes searched by Lazy SMP helper processes
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tt_cutoffs = 0
+        self.beta_cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.null_move_tries = 0
+        self.null_move_cutoffs = 0
+        self.lmr_reductions = 0
+        self.lmr_researches = 0
+        self.delta_prunes = 0
+        self.see_prunes = 0
+        self.mate_nodes = 0  # nodes of the root mate solver
+        self.mate_found = False  # the move came from the mate solver
+        self.book_move = False  # the move came from the opening book without searching
+        self.cache_hit = False  # the move came from the persistent analysis cache
+        # (depth, nodes, seconds) of every completed iteration
+        self.iterations: List[Tuple[int, int, float]] = []
+        self.time = 0.0
+
+    @property
+    def total_nodes(self) -> int:
+        return self.nodes + self.qnodes
+
+    @property
+    def nps(self) -> int:
+        return int(self.total_nodes / self.time) if self.time > 0 else 0
+
+    @property
+    def quiescence_share(self) -> float:
+        """Fraction of the nodes spent in quiescence search"""
+        return self.qnodes / self.total_nodes if self.total_nodes else 0.0
+
+    @property
+    def tt_hit_rate(self) -> float:
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        """Fraction of beta cutoffs caused by the first move searched (move ordering quality)"""
+        return self.first_move_cutoffs / self.beta_cutoffs if self.beta_cutoffs else 0.0
+
+    @property
+    def effective_branching_factor(self) -> float:
+        """Growth of the node count between the last two iterations"""
+        if len(self.iterations) < 2 or not self.iterations[-2][1]:
+            return 0.0
+        return self.iterations[-1][1] / self.iterations[-2][1]
+
+    def copy(self) -> 'SearchStats':
+        stats = SearchStats()
+        stats.__dict__.update(self.__dict__)
+        stats.iterations = list(self.iterations)
+        return stats
+
+    def as_dict(self) -> Dict[str, object]:
+        """Counters and derived rates, e.g. for logging as JSON"""
+        data = dict(self.__dict__)
+        data['iterations'] = [list(iteration) for iteration in self.iterations]
+        for name in ('total_nodes', 'nps', 'quiescence_share', 'tt_hit_rate',
+                     'first_move_cutoff_rate', 'effective_branching_factor'):
+            data[name] = getattr(self, name)
+        return data
+
+    def __repr__(self):
+        return (f"SearchStats(nodes={self.nodes}, qnodes={self.qnodes}, tt_hit_rate={self.tt_hit_rate:.2f}, "
+                f"first_move_cutoff_rate={self.first_move_cutoff_rate:.2f}, "
+                f"ebf={self.effective_branching_factor:.2f}, time={self.time:.2f})")
+
+
+class SearchInfo:
+    """Result of one completed iterative deepening iteration (depth 0 for a root mate solver result)"""
+    def __init__(self, depth: int, score: int, pv: List[chess.Move], nodes: int, time: float,
+                 stats: Optional[SearchStats] = None):
+        self.depth = depth
+        self.score = score
+        self.pv = pv
+        self.nodes = nodes
+        self.time = time
+        self.stats = stats  # snapshot of the search statistics after this iteration
+
+    def __repr__(self):
+        pv = ' '.join(move.uci() for move in self.pv)
+        return f"SearchInfo(depth={self.depth}, score={self.score}, nodes={self.nodes}, pv={pv})"
+
+
+class SearchAborted(Exception):
+    """Raised inside the search tree to unwind a stopped search"""
+
+
+class SearchHandle:
+    """A search running in a background thread.
+
+    With multipv > 1 it runs ChessEngine.analyse and leaves the ranked lines in lines.
+    """
+    def __init__(self, engine: 'ChessEngine', board: chess.Board, limits: Optional[SearchLimits],
+                 multipv: int = 1):
+        self.engine = engine
+        self.multipv = multipv
+        self.best_move: Optional[chess.Move] = None
+        self.lines: List[SearchInfo] = []  # set when a multi-PV search is done
+        self.last_info: Optional[SearchInfo] = None
+        self.stats: Optional[SearchStats] = None  # set when the search is done
+        self._infos: 'queue.Queue[SearchInfo]' = queue.Queue()
+        self._done = threading.Event()
+        # Created before the thread starts, so a stop() issued right away isn't lost
+        self._stop = threading.Event()
+        # Search a private copy so the caller can keep using its board
+        self._thread = threading.Thread(target=self._run, args=(board.copy(), limits), daemon=True)
+        self._thread.start()
+
+    def _run(self, board: chess.Board, limits: Optional[SearchLimits]):
+        try:
+            if self.multipv > 1:
+                self.lines = self.engine.analyse(board, limits, self.multipv,
+                                                 lambda lines: self._infos.put(lines[0]), self._stop)
+                self.best_move = self.lines[0].pv[0] if self.lines else None
+            else:
+                self.best_move = self.engine.search(board, limits, self._infos.put, stop_event=self._stop)
+            self.stats = self.engine.stats
+        finally:
+            self._done.set()
+
+    def poll(self) -> List[SearchInfo]:
+        """Return the iteration results reported since the last poll"""
+        infos = []
+        while True:
+            try:
+                infos.append(self._infos.get_nowait())
+            except queue.Empty:
+                break
+        if infos:
+            self.last_info = infos[-1]
+        return infos
+
+    def is_done(self) -> bool:
+        return self._done.is_set()
+
+    def stop(self):
+        """Ask the search to finish as soon as possible"""
+        self._stop.set()
+
+    def ponderhit(self):
+        """The predicted move was played: put a ponder search on the clock"""
+        self.engine.ponderhit()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[chess.Move]:
+        """Block until the search finishes and return its best move"""
+        self._done.wait(timeout)
+        return self.best_move
+
 
 class ChessEngine:
-    def __init__(self, depth: int):
+    def __init__(self, depth: int, hash_mb: int = 16, threads: int = 1, book_path: Optional[str] = None,
+                 analysis_cache: Optional[AnalysisCache] = None):
         self.depth = depth
         self.nodes_searched = 0
-        self.transposition_table = {}
-        self.history_table: Dict[Tuple[int, int], int] = {}  # (from_square, to_square) -> score
+        self.stats = SearchStats()  # statistics of the current or last search
+        self.stop_event = threading.Event()  # stop token of the current search
+        self.deadline: Optional[float] = None
+        self.soft_deadline: Optional[float] = None  # no new iteration is started after this
+        self.search_start = 0.0
+        # Soft and hard time of the current search, applied by ponderhit() when pondering
+        self.ponder_time: Tuple[Optional[float], Optional[float]] = (None, None)
+        # Set by ponderhit(), which may come before search() has set its limits
+        self.ponder_hit = False
+        self._clock_lock = threading.Lock()
+        self.node_limit: Optional[int] = None
+        
+        # With several threads, helper processes search the same root and share
+        # the transposition table through shared memory (Lazy SMP)
+        self.threads = max(1, threads)
+        self.transposition_table = TranspositionTable(hash_mb, shared=self.threads > 1)
+        self.helper_pool: Optional[HelperPool] = None
+        if self.threads > 1:
+            self.helper_pool = HelperPool(self.threads - 1, depth, hash_mb, self.transposition_table.name)
+        # Positions found in the opening book are played without searching
+        self.opening_book = OpeningBook(book_path) if book_path else None
+        # Results of earlier searches, possibly shared with other engines; not closed by close()
+        self.analysis_cache = analysis_cache
+        # Set in helper processes
+        self.is_helper = False
+        self.stop_signal = None
+        self.depth_offset = 0
+        
+        # Quiet move cutoff scores per side to move, indexed [color][from_square * 64 + to_square]
+        self.history_table: List[List[int]] = [[0] * 4096, [0] * 4096]
+        self.killer_moves: List[List[Optional[chess.Move]]] = [[None, None] for _ in range(MAX_PLY)]
+        self.pawn_cache: Dict[Tuple[int, int], int] = {}  # (white pawns, black pawns) -> score
         
         # Material values (standard + positional bonus)
         self.piece_values = {
@@ -20,28 +291,51 @@ class ChessEngine:
             chess.KING: 20000
         }
         
+        # Endgame material values (pawns become more valuable, minor pieces less)
+        self.endgame_piece_values = {
+            chess.PAWN: 150,
+            chess.KNIGHT: 300,
+            chess.BISHOP: 300,
+            chess.ROOK: 550,
+            chess.QUEEN: 900,
+            chess.KING: 20000
+        }
+        
         # Initialize piece-square tables
         self.pst = self._initialize_piece_square_tables()
+        self.mg_table, self.eg_table = self._initialize_eval_tables()
         
         # Difficulty-specific parameters
         if depth == 2:  # Easy
+            self.max_depth = 2
             self.use_quiescence = False
             self.use_transposition = False
             self.use_move_ordering = True
             self.max_quiescence_depth = 0
             self.use_history = False
+            self.use_null_move = False
+            self.use_lmr = False
+            self.use_mate_search = False
         elif depth == 3:  # Medium
+            self.max_depth = 3
             self.use_quiescence = True
             self.use_transposition = True
             self.use_move_ordering = True
             self.max_quiescence_depth = 4
             self.use_history = True
-        else:  # Hard
+            self.use_null_move = False
+            self.use_lmr = False
+            self.use_mate_search = True
+        else:  # Hard: selective search goes as deep as the time allows
+            self.max_depth = 8
             self.use_quiescence = True
             self.use_transposition = True
             self.use_move_ordering = True
             self.max_quiescence_depth = 6
             self.use_history = True
+            self.use_null_move = True
+            self.use_lmr = True
+            self.use_mate_search = True
 
     def _initialize_piece_square_tables(self):
         # Advanced piece-square tables for better positional play
@@ -109,76 +403,87 @@ class ChessEngine:
         }
         return pst
 
-    def evaluate_position(self, board: chess.Board) -> float:
-        """Evaluate the current position"""
-        if board.is_checkmate():
-            return -10000 if board.turn else 10000
-        
-        # Basic piece values
-        piece_values = {
-            chess.PAWN: 100,
-            chess.KNIGHT: 320,
-            chess.BISHOP: 330,
-            chess.ROOK: 500,
-            chess.QUEEN: 900,
-            chess.KING: 20000
-        }
-        
-        # Endgame piece values (pawns and king become more valuable)
-        endgame_piece_values = {
-            chess.PAWN: 150,  # Pawns more valuable in endgame
-            chess.KNIGHT: 300,
-            chess.BISHOP: 300,
-            chess.ROOK: 550,
-            chess.QUEEN: 900,
-            chess.KING: 20000
-        }
+    def _initialize_eval_tables(self):
+        """Combine material and piece-square values into signed per-square tables.
+
+        Tables are indexed [color][piece_type][square] and hold values from White's
+        point of view, so an incremental update is a single addition or subtraction.
+        The king carries no material since both kings are always on the board.
+        """
+        mg_table = [[[0] * 64 for _ in range(7)] for _ in range(2)]
+        eg_table = [[[0] * 64 for _ in range(7)] for _ in range(2)]
         
-        # Determine if we're in endgame (no queens or both sides have <= 13 points in material)
-        total_material = sum(len(board.pieces(piece_type, True)) * piece_values[piece_type] +
-                            len(board.pieces(piece_type, False)) * piece_values[piece_type]
-                            for piece_type in [chess.QUEEN, chess.ROOK, chess.BISHOP, chess.KNIGHT])
-        is_endgame = total_material <= 2600  # Roughly equivalent to each side having a queen or less
+        for color in [True, False]:
+            sign = 1 if color else -1
+            for piece_type in chess.PIECE_TYPES:
+                for square in chess.SQUARES:
+                    # Tables are written from White's side with rank 8 first
+                    index = square ^ 56 if color else square
+                    relative_rank = chess.square_rank(square) if color else 7 - chess.square_rank(square)
+                    file = chess.square_file(square)
+                    
+                    mg = self.pst[piece_type][index]
+                    if piece_type == chess.KING:
+                        # King should be more active in endgame
+                        eg = -int((abs(3.5 - file) + abs(3.5 - relative_rank)) * 10)
+                    elif piece_type == chess.PAWN:
+                        # Advanced pawns are very valuable in endgame
+                        eg = relative_rank * 20
+                    else:
+                        eg = mg
+                    
+                    if piece_type != chess.KING:
+                        mg += self.piece_values[piece_type]
+                        eg += self.endgame_piece_values[piece_type]
+                    
+                    mg_table[color][piece_type][square] = sign * mg
+                    eg_table[color][piece_type][square] = sign * eg
         
-        current_values = endgame_piece_values if is_endgame else piece_values
+        return mg_table, eg_table
+
+    def _is_draw(self, board: SearchBoard) -> bool:
+        """Detect fifty-move, repetition and bare-minor-piece draws without generating moves"""
+        halfmove_clock = board.halfmove_clock
+        if halfmove_clock >= 100:
+            return True
         
-        score = 0
+        # King against king and at most one minor piece
+        if not (board.pawns | board.rooks | board.queens) and chess.popcount(board.occupied) <= 3:
+            return True
         
-        # Material and position evaluation
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece is None:
-                continue
-            
-            value = current_values[piece.piece_type]
-            
-            # Add position bonus
-            rank = chess.square_rank(square)
-            file = chess.square_file(square)
-            
-            if is_endgame:
-                if piece.piece_type == chess.KING:
-                    # King should be more active in endgame
-                    center_distance = abs(3.5 - file) + abs(3.5 - rank)
-                    value -= center_distance * 10
-                
-                if piece.piece_type == chess.PAWN:
-                    # Passed and advanced pawns are very valuable in endgame
-                    value += rank * 20 if piece.color else (7 - rank) * 20
-            
-            score += value if piece.color else -value
+        # A repetition needs at least four plies, all of them reversible and none a null move
+        keys = board.keys
+        key = board.key
+        move_stack = board.move_stack
+        end = min(halfmove_clock, len(keys) - 1)
+        for distance in range(2, end + 1, 2):
+            if not move_stack[-distance] or not move_stack[-distance + 1]:
+                break
+            if distance >= 4 and keys[-1 - distance] == key:
+                return True
+        return False
+
+    def evaluate_position(self, board: SearchBoard) -> int:
+        """Evaluate the current position from the incremental search state"""
+        # Taper between middlegame and endgame scores by the remaining material
+        phase = min(board.phase, MAX_PHASE)
+        score = (board.mg_score * phase + board.eg_score * (MAX_PHASE - phase)) // MAX_PHASE
+        score += (self._evaluate_pawn_structure(board)
+                  + self._evaluate_king_safety(board)
+                  + self._evaluate_piece_coordination(board))
+        if not board.turn:
+            score = -score
         
-        # Additional endgame considerations
-        if is_endgame:
-            # Encourage moving king towards enemy king in endgame
+        # Encourage moving king towards enemy king in endgame
+        if phase < MAX_PHASE:
             our_king = board.king(board.turn)
             their_king = board.king(not board.turn)
-            if our_king and their_king:  # Make sure both kings exist
+            if our_king is not None and their_king is not None:
                 king_distance = abs(chess.square_file(our_king) - chess.square_file(their_king)) + \
                               abs(chess.square_rank(our_king) - chess.square_rank(their_king))
-                score += -king_distance * 10 if board.turn else king_distance * 10
+                score -= king_distance * 10 * (MAX_PHASE - phase) // MAX_PHASE
         
-        return score if board.turn else -score
+        return score
 
     def _evaluate_piece_safety(self, piece: chess.Piece, attackers: int, defenders: int, value: int) -> int:
         if attackers == 0:
@@ -189,222 +494,736 @@ class ChessEngine:
             return -value // 3  # Penalty for pieces under attack with insufficient defense
         return 0
 
-    def _evaluate_pawn_structure(self, board: chess.Board) -> int:
+    def _evaluate_pawn_structure(self, board: SearchBoard) -> int:
+        # Pawn structure only depends on the pawns, which rarely change during search
+        pawns = board.pawns
+        cache_key = (pawns & board.occupied_co[chess.WHITE], pawns & board.occupied_co[chess.BLACK])
+        score = self.pawn_cache.get(cache_key)
+        if score is not None:
+            return score
         score = 0
         
         # Evaluate pawn structure for both colors
         for color in [True, False]:
-            pawns = board.pieces(chess.PAWN, color)
+            sign = 1 if color else -1
+            our_pawns = pawns & board.occupied_co[color]
+            their_pawns = pawns & board.occupied_co[not color]
             
-            # Doubled pawns penalty
-            files = [chess.square_file(sq) for sq in pawns]
-            doubled_pawns = len(files) - len(set(files))
-            score += (-20 if color else 20) * doubled_pawns
+            for file in range(8):
+                file_pawns = our_pawns & FILE_MASKS[file]
+                if not file_pawns:
+                    continue
+                count = chess.popcount(file_pawns)
+                
+                # Doubled pawns penalty
+                score -= sign * 20 * (count - 1)
+                
+                # Isolated pawns penalty
+                if not our_pawns & ADJACENT_FILE_MASKS[file]:
+                    score -= sign * 15 * count
             
-            # Isolated pawns penalty
-            for pawn in pawns:
-                file = chess.square_file(pawn)
-                isolated = True
-                for adj_file in [file - 1, file + 1]:
-                    if 0 <= adj_file <= 7:
-                        for rank in range(8):
-                            sq = chess.square(adj_file, rank)
-                            if board.piece_at(sq) == chess.Piece(chess.PAWN, color):
-                                isolated = False
-                                break
-                if isolated:
-                    score += -15 if color else 15
+            # Passed pawns bonus
+            for square in chess.scan_forward(our_pawns):
+                if not PASSED_PAWN_MASKS[color][square] & their_pawns:
+                    rank = chess.square_rank(square)
+                    score += sign * PASSED_PAWN_BONUS[rank if color else 7 - rank]
         
+        if len(self.pawn_cache) >= PAWN_CACHE_SIZE:
+            self.pawn_cache.clear()
+        self.pawn_cache[cache_key] = score
         return score
 
-    def _evaluate_king_safety(self, board: chess.Board) -> int:
+    def _evaluate_king_safety(self, board: SearchBoard) -> int:
         score = 0
         
         for color in [True, False]:
+            sign = 1 if color else -1
             king_square = board.king(color)
-            if not king_square:
+            if king_square is None:
                 continue
-                
-            # King attackers
-            attackers = len(list(board.attackers(not color, king_square)))
-            score += (-50 if color else 50) * attackers
-            
-            # Pawn shield
-            king_file = chess.square_file(king_square)
-            king_rank = chess.square_rank(king_square)
             
-            shield_squares = []
-            if color:  # White
-                for f in range(max(0, king_file - 1), min(8, king_file + 2)):
-                    shield_squares.extend([
-                        chess.square(f, r) for r in range(max(0, king_rank - 1), min(8, king_rank + 2))
-                    ])
-            else:  # Black
-                for f in range(max(0, king_file - 1), min(8, king_file + 2)):
-                    shield_squares.extend([
-                        chess.square(f, r) for r in range(max(0, king_rank - 1), min(8, king_rank + 2))
-                    ])
+            # King attackers
+            attackers = chess.popcount(board.attackers_mask(not color, king_square))
+            score -= sign * 50 * attackers
             
-            # Count friendly pieces near king
-            defenders = sum(1 for sq in shield_squares if board.piece_at(sq) 
-                          and board.piece_at(sq).color == color)
-            score += (20 if color else -20) * defenders
+            # Count friendly pieces around the king
+            defenders = chess.popcount(KING_ZONE_MASKS[king_square] & board.occupied_co[color])
+            score += sign * 20 * defenders
         
         return score
 
-    def _evaluate_piece_coordination(self, board: chess.Board) -> int:
+    def _evaluate_piece_coordination(self, board: SearchBoard) -> int:
         score = 0
+        pawns = board.pawns
         
-        # Bonus for bishop pair
-        if len(list(board.pieces(chess.BISHOP, True))) >= 2:
-            score += 50
-        if len(list(board.pieces(chess.BISHOP, False))) >= 2:
-            score -= 50
-        
-        # Bonus for connected rooks
         for color in [True, False]:
-            rooks = list(board.pieces(chess.ROOK, color))
-            if len(rooks) >= 2:
-                rook_files = [chess.square_file(sq) for sq in rooks]
-                if any(abs(rook_files[i] - rook_files[i+1]) == 0 
-                       for i in range(len(rook_files)-1)):
-                    score += 30 if color else -30
+            sign = 1 if color else -1
+            
+            # Bonus for bishop pair
+            if chess.popcount(board.bishops & board.occupied_co[color]) >= 2:
+                score += sign * 50
+            
+            rooks = board.rooks & board.occupied_co[color]
+            for square in chess.scan_forward(rooks):
+                file_mask = FILE_MASKS[chess.square_file(square)]
+                
+                # Bonus for connected rooks on the same file
+                if rooks & file_mask & ~chess.BB_SQUARES[square]:
+                    score += sign * 15
+                
+                # Bonus for rooks on open and semi-open files
+                if not pawns & file_mask:
+                    score += sign * 25
+                elif not pawns & board.occupied_co[color] & file_mask:
+                    score += sign * 10
         
         return score
 
-    def _order_moves(self, board: chess.Board, moves: List[chess.Move]) -> List[chess.Move]:
-        if not self.use_move_ordering:
-            return moves
-            
-        move_scores = []
-        for move in moves:
-            score = 0
-            
-            # MVV-LVA (Most Valuable Victim - Least Valuable Attacker)
-            if board.is_capture(move):
-                victim = board.piece_at(move.to_square)
-                attacker = board.piece_at(move.from_square)
-                if victim and attacker:
-                    score = 10 * self.piece_values[victim.piece_type] - self.piece_values[attacker.piece_type]
-            
-            # Promotion score
+    def _generate_noisy_moves(self, board: SearchBoard) -> List[Tuple[chess.Move, int]]:
+        """Legal captures and promotions with the material they win, best first by MVV-LVA"""
+        piece_values = self.piece_values
+        us = board.turn
+        noisy = []
+        for move in board.generate_legal_captures():
+            victim = board.piece_type_at(move.to_square) or chess.PAWN  # en passant
+            gain = piece_values[victim]
             if move.promotion:
-                score += self.piece_values[move.promotion]
-            
-            # History heuristic
-            if self.use_history:
-                score += self.history_table.get((move.from_square, move.to_square), 0)
-            
-            # Check extension
-            board.push(move)
-            if board.is_check():
-                score += 100
-            board.pop()
-            
-            move_scores.append((move, score))
+                gain += piece_values[move.promotion] - piece_values[chess.PAWN]
+            noisy.append((10 * gain - piece_values[board.piece_type_at(move.from_square)], move, gain))
+        promoting_pawns = board.pawns & board.occupied_co[us] & (chess.BB_RANK_7 if us else chess.BB_RANK_2)
+        if promoting_pawns:
+            for move in board.generate_legal_moves(promoting_pawns, ~board.occupied):
+                gain = piece_values[move.promotion] - piece_values[chess.PAWN]
+                noisy.append((10 * gain, move, gain))
+        noisy.sort(key=lambda item: item[0], reverse=True)
+        return [(move, gain) for _, move, gain in noisy]
+
+    def _generate_moves(self, board: SearchBoard, hash_move: Optional[chess.Move], ply: int) -> Iterator[chess.Move]:
+        """Yield legal moves in stages so a cutoff skips generating and scoring the rest.
+
+        Stages: hash move, winning and equal captures and promotions by MVV-LVA,
+        killer moves, quiet moves by history score, then captures that lose
+        material by static exchange evaluation.
+        """
+        if not self.use_move_ordering:
+            yield from board.legal_moves
+            return
+        
+        tried = []
+        
+        # Hash move
+        if hash_move and board.is_legal(hash_move):
+            tried.append(hash_move)
+            yield hash_move
         
-        return [move for move, _ in sorted(move_scores, key=lambda x: x[1], reverse=True)]
+        # Captures (MVV-LVA) and promotions
+        us = board.turn
+        promoting_pawns = board.pawns & board.occupied_co[us] & (chess.BB_RANK_7 if us else chess.BB_RANK_2)
+        losing_captures = []
+        for move, gain in self._generate_noisy_moves(board):
+            if move in tried:
+                continue
+            if self._is_losing_capture(board, move, gain):
+                losing_captures.append(move)
+                continue
+            tried.append(move)
+            yield move
+        
+        # Killer moves
+        if ply < MAX_PLY:
+            for killer in self.killer_moves[ply]:
+                if (killer and killer not in tried and not killer.promotion
+                        and board.is_legal(killer) and not board.is_capture(killer)):
+                    tried.append(killer)
+                    yield killer
+        
+        # Quiet moves by history
+        ep_square = board.ep_square
+        quiets = []
+        for move in board.generate_legal_moves(~promoting_pawns, ~board.occupied_co[not us]):
+            if move.to_square == ep_square and board.pawns & chess.BB_SQUARES[move.from_square]:
+                continue  # en passant was generated with the captures
+            if move not in tried:
+                quiets.append(move)
+        if self.use_history:
+            history = self.history_table[us]
+            quiets.sort(key=lambda move: history[move.from_square * 64 + move.to_square], reverse=True)
+        yield from quiets
+        
+        yield from losing_captures
+
+    def _is_losing_capture(self, board: SearchBoard, move: chess.Move, gain: int) -> bool:
+        """Check a capture or promotion with SEE; taking with a cheaper piece never loses"""
+        if not move.promotion and gain >= self.piece_values[board.piece_type_at(move.from_square)]:
+            return False
+        return static_exchange_evaluation(board, move, self.piece_values) < 0
+
+    def _check_limits(self):
+        """Abort the search once it is stopped or the deadline or node budget is exhausted"""
+        if self.stop_event.is_set():
+            raise SearchAborted()
+        if self.stop_signal is not None and self.stop_signal.value:
+            raise SearchAborted()
+        if self.deadline is not None and time.time() >= self.deadline:
+            raise SearchAborted()
+        if self.node_limit is not None and self.nodes_searched >= self.node_limit:
+            raise SearchAborted()
 
-    def quiescence_search(self, board: chess.Board, alpha: float, beta: float, depth: int = -4) -> float:
+    def _allocate_time(self, board: chess.Board, limits: SearchLimits) -> Tuple[Optional[float], Optional[float]]:
+        """Return (soft, hard) time limits in seconds for this move.
+
+        No new iteration is started after the soft limit; the search is aborted
+        at the hard limit.
+        """
+        if limits.movetime is not None:
+            return limits.movetime, limits.movetime
+        
+        remaining = limits.wtime if board.turn else limits.btime
+        if remaining is None:
+            return None, None
+        increment = limits.winc if board.turn else limits.binc
+        
+        usable = max(0.0, remaining - MOVE_OVERHEAD)
+        moves_to_go = limits.movestogo or max(MIN_MOVES_TO_GO, EXPECTED_GAME_LENGTH - board.fullmove_number)
+        soft = min(usable / moves_to_go + increment * 0.75, usable)
+        hard = min(soft * 3, usable)
+        # The next iteration usually takes several times longer than the last one
+        return soft / 2, hard
+
+    def quiescence_search(self, board: SearchBoard, alpha: int, beta: int, depth: int = 0) -> int:
+        """Resolve captures and promotions until the position is quiet or max_quiescence_depth is reached"""
         if not self.use_quiescence:
             return self.evaluate_position(board)
+        
+        self.nodes_searched += 1
+        self.stats.qnodes += 1
+        if self.nodes_searched % CHECK_INTERVAL == 0:
+            self._check_limits()
             
         stand_pat = self.evaluate_position(board)
+        if stand_pat >= beta or depth >= self.max_quiescence_depth:
+            return stand_pat
         
-        if depth == 0:
+        # Delta pruning: even winning a queen would not raise alpha
+        if stand_pat + self.piece_values[chess.QUEEN] + DELTA_MARGIN <= alpha:
+            self.stats.delta_prunes += 1
             return stand_pat
             
-        if stand_pat >= beta:
-            return beta
-            
+        best_score = stand_pat
         alpha = max(alpha, stand_pat)
         
-        for move in self._order_moves(board, list(board.legal_moves)):
-            if board.is_capture(move):
-                board.push(move)
-                score = -self.quiescence_search(board, -beta, -alpha, depth + 1)
-                board.pop()
-                
-                if score >= beta:
-                    return beta
-                alpha = max(alpha, score)
+        for move, gain in self._generate_noisy_moves(board):
+            # Delta pruning: skip captures that can't bring the score back to alpha
+            if stand_pat + gain + DELTA_MARGIN <= alpha:
+                self.stats.delta_prunes += 1
+                continue
+            # Captures that lose material can't improve a quiet position
+            if self._is_losing_capture(board, move, gain):
+                self.stats.see_prunes += 1
+                continue
+            
+            board.push(move)
+            score = -self.quiescence_search(board, -beta, -alpha, depth + 1)
+            board.pop()
+            
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
         
-        return alpha
+        return best_score
 
-    def alpha_beta(self, board: chess.Board, depth: int, alpha: float, beta: float, maximizing: bool) -> Tuple[float, chess.Move]:
+    def alpha_beta(self, board: SearchBoard, depth: int, alpha: int, beta: int, ply: int = 0) -> Tuple[int, chess.Move]:
+        """Negamax principal variation search; scores are from the side to move's view"""
+        stats = self.stats
         self.nodes_searched += 1
+        stats.nodes += 1
+        if self.nodes_searched % CHECK_INTERVAL == 0:
+            self._check_limits()
+        
+        # Repeating a position inside the search is scored as a draw
+        if ply > 0 and self._is_draw(board):
+            return 0, None
+        
+        # Mate distance pruning: nothing below can beat a mate already found nearer the root
+        if ply > 0:
+            alpha = max(alpha, -MATE_SCORE + ply)
+            beta = min(beta, MATE_SCORE - ply - 1)
+            if alpha >= beta:
+                return alpha, None
+        
+        # Transposition table lookup (only trust entries searched at least as deep)
+        key = board.key
+        hash_move = None
+        if self.use_transposition and depth > 0:
+            entry = self.transposition_table.probe(key)
+            stats.tt_probes += 1
+            if entry:
+                stats.tt_hits += 1
+                entry_depth, entry_score, entry_bound, hash_move = entry
+                entry_score = self._score_from_tt(entry_score, ply)
+                if ply > 0 and entry_depth >= depth and (
+                        entry_bound == BOUND_EXACT
+                        or (entry_bound == BOUND_LOWER and entry_score >= beta)
+                        or (entry_bound == BOUND_UPPER and entry_score <= alpha)):
+                    stats.tt_cutoffs += 1
+                    return entry_score, hash_move
         
-        # Transposition table lookup
-        board_hash = board.fen() if self.use_transposition else None
-        if self.use_transposition and depth > 0 and board_hash in self.transposition_table:
-            return self.transposition_table[board_hash]
+        # Don't stop at the horizon while in check, so checkmates are always seen
+        in_check = board.is_check()
+        if depth <= 0 and in_check:
+            depth = 1
         
-        if depth == 0 or board.is_game_over():
+        if depth <= 0:
             if self.use_quiescence:
+                # The horizon node is counted by quiescence_search, as a quiescence node
+                self.nodes_searched -= 1
+                stats.nodes -= 1
                 return self.quiescence_search(board, alpha, beta), None
             return self.evaluate_position(board), None
 
+        is_pv_node = beta - alpha > 1
+        
+        # Null move pruning: if passing still fails high, a real move will too.
+        # Skipped with only pawns left, where zugzwang makes passing an advantage.
+        if (self.use_null_move and not is_pv_node and not in_check and ply > 0
+                and depth >= NULL_MOVE_MIN_DEPTH and abs(beta) < MATE_BOUND
+                and board.move_stack and board.move_stack[-1]
+                and board.occupied_co[board.turn] & ~(board.pawns | board.kings)
+                and self.evaluate_position(board) >= beta):
+            reduction = 3 if depth >= 6 else 2
+            stats.null_move_tries += 1
+            board.push_null()
+            score = -self.alpha_beta(board, depth - 1 - reduction, -beta, -beta + 1, ply + 1)[0]
+            board.pop()
+            if score >= beta:
+                stats.null_move_cutoffs += 1
+                return beta, None
+        
+        alpha_orig = alpha
+        best_score = -INFINITY
         best_move = None
-        moves = self._order_moves(board, list(board.legal_moves))
-        
-        if maximizing:
-            max_eval = float('-inf')
-            for move in moves:
-                board.push(move)
-                eval, _ = self.alpha_beta(board, depth - 1, alpha, beta, False)
-                board.pop()
-                
-                if eval > max_eval:
-                    max_eval = eval
-                    best_move = move
-                alpha = max(alpha, eval)
-                if beta <= alpha:
-                    break
+        killers = self.killer_moves[ply] if ply < MAX_PLY else ()
+        for i, move in enumerate(self._generate_moves(board, hash_move, ply)):
+            # Late move reductions for quiet moves ordered after the first few
+            reduction = 0
+            if (self.use_lmr and i >= LMR_MIN_MOVES and depth >= LMR_MIN_DEPTH and not in_check
+                    and not move.promotion and move not in killers and not board.is_capture(move)):
+                reduction = 1 if i < 2 * LMR_MIN_MOVES else 2
             
-            if self.use_transposition:
-                self.transposition_table[board_hash] = (max_eval, best_move)
-            return max_eval, best_move
-        else:
-            min_eval = float('inf')
-            for move in moves:
-                board.push(move)
-                eval, _ = self.alpha_beta(board, depth - 1, alpha, beta, True)
-                board.pop()
-                
-                if eval < min_eval:
-                    min_eval = eval
-                    best_move = move
-                beta = min(beta, eval)
-                if beta <= alpha:
-                    break
+            board.push(move)
+            if i == 0:
+                score = -self.alpha_beta(board, depth - 1, -beta, -alpha, ply + 1)[0]
+            else:
+                if reduction and board.is_check():
+                    reduction = 0
+                if reduction:
+                    stats.lmr_reductions += 1
+                # Scout with a null window; re-search only if the move may beat alpha
+                score = -self.alpha_beta(board, depth - 1 - reduction, -alpha - 1, -alpha, ply + 1)[0]
+                if reduction and score > alpha:
+                    stats.lmr_researches += 1
+                    score = -self.alpha_beta(board, depth - 1, -alpha - 1, -alpha, ply + 1)[0]
+                if alpha < score < beta:
+                    score = -self.alpha_beta(board, depth - 1, -beta, -alpha, ply + 1)[0]
+            board.pop()
             
-            if self.use_transposition:
-                self.transposition_table[board_hash] = (min_eval, best_move)
-            return min_eval, best_move
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        stats.beta_cutoffs += 1
+                        if i == 0:
+                            stats.first_move_cutoffs += 1
+                        if not move.promotion and not board.is_capture(move):
+                            self._record_cutoff(board, move, depth, ply)
+                        break
+        
+        if best_move is None:
+            # No legal moves: checkmate (prefer the shortest) or stalemate
+            return (-MATE_SCORE + ply if in_check else 0), None
+        
+        if self.use_transposition:
+            if best_score <= alpha_orig:
+                bound = BOUND_UPPER
+            elif best_score >= beta:
+                bound = BOUND_LOWER
+            else:
+                bound = BOUND_EXACT
+            self.transposition_table.store(key, depth, self._score_to_tt(best_score, ply), bound, best_move)
+        return best_score, best_move
 
-    def get_best_move(self, board: chess.Board) -> chess.Move:
+    def _record_cutoff(self, board: SearchBoard, move: chess.Move, depth: int, ply: int):
+        """Remember a quiet move that caused a beta cutoff for ordering its siblings"""
+        if ply < MAX_PLY:
+            killers = self.killer_moves[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        if self.use_history:
+            # Deeper cutoffs are more reliable
+            self.history_table[board.turn][move.from_square * 64 + move.to_square] += depth * depth
+
+    def _age_history(self):
+        """Halve history scores and clear killers so a new search favours fresh information"""
+        self.history_table = [[score // 2 for score in history] for history in self.history_table]
+        self.killer_moves = [[None, None] for _ in range(MAX_PLY)]
+
+    def _score_to_tt(self, score: int, ply: int) -> int:
+        """Store mate scores relative to the node rather than the root"""
+        if score > MATE_BOUND:
+            return score + ply
+        if score < -MATE_BOUND:
+            return score - ply
+        return score
+
+    def _score_from_tt(self, score: int, ply: int) -> int:
+        if score > MATE_BOUND:
+            return score - ply
+        if score < -MATE_BOUND:
+            return score + ply
+        return score
+
+    def _aspiration_search(self, board: SearchBoard, depth: int, previous_score: Optional[int]) -> Tuple[int, chess.Move]:
+        """Search the root with a window around the previous iteration's score, widening on failure"""
+        if previous_score is None or depth < ASPIRATION_MIN_DEPTH or abs(previous_score) > MATE_BOUND:
+            return self.alpha_beta(board, depth, -INFINITY, INFINITY)
+        
+        window = ASPIRATION_WINDOW
+        alpha = previous_score - window
+        beta = previous_score + window
+        while True:
+            score, move = self.alpha_beta(board, depth, alpha, beta)
+            if score <= alpha:
+                alpha = max(score - window, -INFINITY)
+            elif score >= beta:
+                beta = min(score + window, INFINITY)
+            else:
+                return score, move
+            window *= 2
+
+    def _search_root_multipv(self, board: SearchBoard, depth: int, multipv: int,
+                             previous: List[chess.Move]) -> List[Tuple[int, chess.Move]]:
+        """Search every root move and return the multipv best as (score, move), best first.
+
+        Alpha is the multipv-th best score so far, so moves that can't enter the
+        top lines fail low on a null window instead of getting an exact score.
+        The previous iteration's best moves are searched first.
+        """
+        self.nodes_searched += 1
+        self.stats.nodes += 1
+        hash_move = previous[0] if previous else None
+        moves = list(previous) + [move for move in self._generate_moves(board, hash_move, 0)
+                                  if move not in previous]
+        ranked: List[Tuple[int, chess.Move]] = []
+        for move in moves:
+            alpha = ranked[-1][0] if len(ranked) >= multipv else -INFINITY
+            board.push(move)
+            if alpha == -INFINITY:
+                score = -self.alpha_beta(board, depth - 1, -INFINITY, INFINITY, 1)[0]
+            else:
+                score = -self.alpha_beta(board, depth - 1, -alpha - 1, -alpha, 1)[0]
+                if score > alpha:
+                    score = -self.alpha_beta(board, depth - 1, -INFINITY, -alpha, 1)[0]
+            board.pop()
+            if score > alpha:
+                ranked.append((score, move))
+                ranked.sort(key=lambda item: item[0], reverse=True)
+                del ranked[multipv:]
+        if ranked and self.use_transposition:
+            self.transposition_table.store(board.key, depth, ranked[0][0], BOUND_EXACT, ranked[0][1])
+        return ranked
+
+    def _extract_pv(self, board: SearchBoard, first_move: chess.Move) -> List[chess.Move]:
+        """Follow hash moves from the root to build the principal variation"""
+        pv = [first_move]
+        if not self.use_transposition:
+            return pv
+        
+        board.push(first_move)
+        seen = {board.key}
+        while len(pv) < self.max_depth * 2:
+            entry = self.transposition_table.probe(board.key)
+            if not entry or not entry[3] or not board.is_legal(entry[3]):
+                break
+            board.push(entry[3])
+            pv.append(entry[3])
+            if board.key in seen:
+                break
+            seen.add(board.key)
+        for _ in pv:
+            board.pop()
+        return pv
+
+    def search(self, board: chess.Board, limits: Optional[SearchLimits] = None,
+               info_callback: Optional[Callable[[SearchInfo], None]] = None,
+               stats_callback: Optional[Callable[[SearchStats], None]] = None,
+               stop_event: Optional[threading.Event] = None) -> chess.Move:
+        """Run an iterative deepening search on board and return the best move.
+
+        info_callback is called with a SearchInfo after every completed iteration,
+        and stats_callback with the final SearchStats (also left in self.stats).
+        Setting stop_event (a fresh one if not given), the hard time limit or the
+        node budget abort the search, which then returns the best move of the
+        last completed iteration.
+        """
+        if limits is None:
+            limits = SearchLimits(movetime=5)
+        max_depth = limits.depth or self.max_depth
+        self.stop_event = stop_event if stop_event is not None else threading.Event()
         self.nodes_searched = 0
-        start_time = time.time()
+        self.stats = stats = SearchStats()
+        self.search_start = start_time = time.time()
+        soft_time, hard_time = self._allocate_time(board, limits)
+        with self._clock_lock:
+            self.ponder_time = (soft_time, hard_time)
+            if limits.ponder and not self.ponder_hit:
+                # The clock only starts at ponderhit(); until then only a stop ends the search
+                self.deadline = self.soft_deadline = None
+            else:
+                self.deadline = start_time + hard_time if hard_time is not None else None
+                self.soft_deadline = start_time + soft_time if soft_time is not None else None
+        self.node_limit = limits.nodes
+        
+        if self.opening_book and not self.is_helper:
+            book_move = self.opening_book.choose_move(board)
+            if book_move:
+                stats.book_move = True
+                if stats_callback:
+                    stats_callback(stats)
+                return book_move
+        
+        # The search runs on its own compact copy; board itself is never modified
+        position = SearchBoard(board, self.mg_table, self.eg_table)
+        if not self.is_helper:
+            self.transposition_table.new_search()
+        
+        root_key = position.key  # an aborted search leaves its moves on position
+        
+        # Positions this level has analysed before are answered from the cache
+        # when the cached search reached the full depth; otherwise its move is tried first
+        if self.analysis_cache is not None and not self.is_helper:
+            cached = self.analysis_cache.probe(root_key, self.depth)
+            if cached:
+                cached_depth, cached_score, cached_bound, cached_move = cached
+                if (cached_bound == BOUND_EXACT and cached_depth >= max_depth
+                        and board.is_legal(cached_move)):
+                    stats.cache_hit = True
+                    if info_callback:
+                        info_callback(SearchInfo(cached_depth, cached_score, [cached_move], 0, 0.0, stats.copy()))
+                    if stats_callback:
+                        stats_callback(stats)
+                    return cached_move
+                self.transposition_table.store(root_key, cached_depth, cached_score, cached_bound, cached_move)
+        
+        # Forced mates are proven by the mate solver far faster than by alpha-beta.
+        # It runs under the same limits; once they abort it, the search below stops at once.
+        mate = None
+        if self.use_mate_search and not self.is_helper:
+            try:
+                mate = self.find_mate(board)
+            except SearchAborted:
+                pass
+            if mate:
+                moves, pv = mate
+                stats.mate_found = True
+                stats.time = time.time() - start_time
+                if info_callback:
+                    # Depth 0: no iterative deepening iteration was searched
+                    info_callback(SearchInfo(0, MATE_SCORE - (2 * moves - 1), pv,
+                                             self.nodes_searched, stats.time, stats.copy()))
+                if stats_callback:
+                    stats_callback(stats)
+                return pv[0]
+        
+        self._age_history()
+        best_move = None
+        best_score = None
+        completed_depth = 0
+        score = None
+        
+        if self.helper_pool:
+            self.helper_pool.start(board, SearchLimits(depth=max_depth), self.transposition_table.generation)
         
         try:
             # Iterative deepening
-            best_move = None
-            for current_depth in range(1, self.depth + 1):
-                _, move = self.alpha_beta(board, current_depth, float('-inf'), float('inf'), True)
+            for current_depth in range(1, max_depth + 1):
+                search_depth = min(current_depth + self.depth_offset, max_depth)
+                iteration_nodes = stats.total_nodes
+                iteration_start = time.time()
+                score, move = self._aspiration_search(position, search_depth, score)
+                stats.iterations.append((search_depth, stats.total_nodes - iteration_nodes,
+                                         time.time() - iteration_start))
                 if move:
                     best_move = move
+                    best_score = score
+                    completed_depth = search_depth
+                    if info_callback:
+                        stats.time = time.time() - start_time
+                        info_callback(SearchInfo(search_depth, score, self._extract_pv(position, move),
+                                                 self.nodes_searched, stats.time, stats.copy()))
                 
-                # Time check
-                if time.time() - start_time > 5:  # 5 second limit
+                # Don't start an iteration that can't finish in time
+                if self.soft_deadline is not None and time.time() >= self.soft_deadline:
                     break
-            
-            # Auto-promote to queen if it's a pawn move to the last rank
-            if best_move and board.piece_at(best_move.from_square).piece_type == chess.PAWN:
-                if chess.square_rank(best_move.to_square) in [0, 7]:
-                    best_move = chess.Move(best_move.from_square, best_move.to_square, chess.QUEEN)
-            
-            return best_move
-            
+                if self.node_limit is not None and self.nodes_searched >= self.node_limit:
+                    break
+        except SearchAborted:
+            pass
         except Exception as e:
             print(f"Error in search: {e}")
-            return list(board.legal_moves)[0] 
\ No newline at end of file
+        finally:
+            if self.helper_pool:
+                stats.helper_nodes = self.helper_pool.stop()
+                self.nodes_searched += stats.helper_nodes
+            stats.time = time.time() - start_time
+            if stats_callback:
+                stats_callback(stats)
+        
+        # Remember the result for later sessions unless the search was cancelled
+        if self.analysis_cache is not None and not self.is_helper and best_move and not self.stop_event.is_set():
+            self.analysis_cache.store(root_key, self.depth, completed_depth, best_score, BOUND_EXACT, best_move)
+        
+        if best_move is None:
+            legal_moves = list(board.legal_moves)
+            if not legal_moves:
+                return None
+            best_move = legal_moves[0]
+        
+        return best_move
+
+    def ponderhit(self):
+        """Apply the time limits of a ponder search.
+
+        The time spent pondering counts toward the move's budget, so a long
+        ponder leads to an immediate answer from the iterations already done.
+        If search() hasn't set its limits yet, it applies them itself.
+        """
+        with self._clock_lock:
+            self.ponder_hit = True
+            soft_time, hard_time = self.ponder_time
+            self.soft_deadline = self.search_start + soft_time if soft_time is not None else None
+            self.deadline = self.search_start + hard_time if hard_time is not None else None
+
+    def new_game(self):
+        """Prepare for a new game without throwing away what earlier games learned.
+
+        Transposition table entries from earlier games stay usable but become
+        replaceable, and history scores are aged as between two moves.
+        """
+        self.nodes_searched = 0
+        self.stats = SearchStats()
+        self.transposition_table.new_search()
+        self._age_history()
+
+    def find_mate(self, board: chess.Board, max_moves: Optional[int] = None) -> Optional[Tuple[int, List[chess.Move]]]:
+        """Shortest forced mate for the side to move as (moves, principal variation), or None.
+
+        Mates of up to max_moves (default MATE_SEARCH_CHECKS_MOVES) made only of
+        checks are found, and mates of up to MATE_SEARCH_FULL_MOVES with any moves.
+        The solver's nodes count toward nodes_searched, and it is aborted with
+        SearchAborted by the limits of the current search (stop, deadline or node budget).
+        """
+        best = None
+        for checks_only, limit in ((False, MATE_SEARCH_FULL_MOVES), (True, max_moves or MATE_SEARCH_CHECKS_MOVES)):
+            if best:
+                limit = min(limit, best[0] - 1)
+            base_nodes = self.nodes_searched
+            
+            def check_limits(nodes: int):
+                self.nodes_searched = base_nodes + nodes
+                self._check_limits()
+            
+            solver = MateSearch(MATE_SEARCH_NODES, checks_only, check_limits)
+            try:
+                mate = solver.find_mate(board, limit)
+            finally:
+                self.nodes_searched = base_nodes + solver.nodes
+                self.stats.mate_nodes += solver.nodes
+            if mate:
+                best = mate
+        return best
+
+    def analyse(self, board: chess.Board, limits: Optional[SearchLimits] = None, multipv: int = 3,
+                info_callback: Optional[Callable[[List[SearchInfo]], None]] = None,
+                stop_event: Optional[threading.Event] = None) -> List[SearchInfo]:
+        """Return the multipv best root moves as SearchInfos (score and PV), best first.
+
+        One iterative deepening search ranks all the lines, sharing the
+        transposition table between them. The opening book and the mate solver
+        are skipped so every line has a searched score. info_callback is called
+        with the lines after every completed iteration; a search stopped through
+        stop_event returns the lines of the last completed one.
+        """
+        if limits is None:
+            limits = SearchLimits(movetime=5)
+        max_depth = limits.depth or self.max_depth
+        self.stop_event = stop_event if stop_event is not None else threading.Event()
+        self.nodes_searched = 0
+        self.stats = stats = SearchStats()
+        start_time = time.time()
+        soft_time, hard_time = self._allocate_time(board, limits)
+        self.deadline = start_time + hard_time if hard_time is not None else None
+        self.node_limit = limits.nodes
+        
+        position = SearchBoard(board, self.mg_table, self.eg_table)
+        self.transposition_table.new_search()
+        self._age_history()
+        
+        # The cached best move of this level is searched first
+        previous: List[chess.Move] = []
+        if self.analysis_cache is not None:
+            cached = self.analysis_cache.probe(position.key, self.depth)
+            if cached and board.is_legal(cached[3]):
+                previous = [cached[3]]
+        
+        lines: List[SearchInfo] = []
+        try:
+            for depth in range(1, max_depth + 1):
+                iteration_nodes = stats.total_nodes
+                iteration_start = time.time()
+                ranked = self._search_root_multipv(position, depth, multipv, previous)
+                stats.iterations.append((depth, stats.total_nodes - iteration_nodes, time.time() - iteration_start))
+                if not ranked:
+                    break
+                previous = [move for _, move in ranked]
+                stats.time = time.time() - start_time
+                lines = [SearchInfo(depth, score, self._extract_pv(position, move), self.nodes_searched, stats.time)
+                         for score, move in ranked]
+                if info_callback:
+                    info_callback(lines)
+                
+                if soft_time is not None and time.time() - start_time >= soft_time:
+                    break
+                if self.node_limit is not None and self.nodes_searched >= self.node_limit:
+                    break
+        except SearchAborted:
+            pass
+        stats.time = time.time() - start_time
+        return lines
+
+    def start_search(self, board: chess.Board, limits: Optional[SearchLimits] = None,
+                     multipv: int = 1) -> SearchHandle:
+        """Start searching a copy of board in a background thread.
+
+        Only one search runs per engine; use a separate engine to search in parallel.
+        """
+        self.ponder_hit = False
+        return SearchHandle(self, board, limits, multipv)
+
+    def close(self):
+        """Shut down helper processes, release the shared transposition table and close the book"""
+        if self.helper_pool:
+            self.helper_pool.close()
+            self.helper_pool = None
+        self.transposition_table.close()
+        if self.opening_book:
+            self.opening_book.close()
+            self.opening_book = None
+
+    def get_best_move(self, board: chess.Board) -> chess.Move:
+        return self.search(board, SearchLimits(movetime=5))
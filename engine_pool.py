@@ -0,0 +1,47 @@
+from typing import Dict, Iterable, Optional, Tuple
+from chess_engine import ChessEngine
+from analysis_cache import AnalysisCache
+
+
+class EnginePool:
+    """Engines kept alive between games, one per configuration.
+
+    Building an engine allocates its transposition table and evaluation tables
+    and, with threads > 1, starts its helper processes. The pool does this once
+    per (depth, hash_mb, threads) and afterwards only prepares the engine for
+    a new game, so the table and what it learned in earlier games are kept.
+    """
+    def __init__(self, hash_mb: int = 16, threads: int = 1, book_path: Optional[str] = None,
+                 analysis_cache: Optional[AnalysisCache] = None):
+        self.hash_mb = hash_mb
+        self.threads = threads
+        self.book_path = book_path
+        self.analysis_cache = analysis_cache
+        self.engines: Dict[Tuple[int, int, int], ChessEngine] = {}
+
+    def get(self, depth: int, hash_mb: Optional[int] = None, threads: Optional[int] = None) -> ChessEngine:
+        """The pooled engine for a configuration, built on first use"""
+        key = (depth, self.hash_mb if hash_mb is None else hash_mb, self.threads if threads is None else threads)
+        engine = self.engines.get(key)
+        if engine is None:
+            engine = ChessEngine(depth, hash_mb=key[1], threads=key[2], book_path=self.book_path,
+                                 analysis_cache=self.analysis_cache)
+            self.engines[key] = engine
+        return engine
+
+    def acquire(self, depth: int, hash_mb: Optional[int] = None, threads: Optional[int] = None) -> ChessEngine:
+        """The pooled engine for a configuration, ready for a new game"""
+        engine = self.get(depth, hash_mb, threads)
+        engine.new_game()
+        return engine
+
+    def warm(self, depths: Iterable[int]):
+        """Build the engines (and start their helper processes) ahead of the first game"""
+        for depth in depths:
+            self.get(depth)
+
+    def close(self):
+        """Close every pooled engine"""
+        for engine in self.engines.values():
+            engine.close()
+        self.engines = {}
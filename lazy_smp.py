@@ -0,0 +1,99 @@
+import multiprocessing
+import queue
+import chess
+from typing import List
+
+# Seconds to wait for helpers to acknowledge a stop before giving up on them
+HELPER_STOP_TIMEOUT = 5
+
+
+def _helper_main(helper_id: int, depth: int, hash_mb: int, tt_name: str, stop_flag, jobs, results):
+    """Helper process: search every root it is sent until told to quit"""
+    from chess_engine import ChessEngine
+    from transposition_table import TranspositionTable
+
+    engine = ChessEngine(depth, hash_mb=0)
+    engine.transposition_table = TranspositionTable(hash_mb, name=tt_name)
+    engine.stop_signal = stop_flag
+    engine.is_helper = True
+    # Half of the helpers search one ply deeper than the main search so the
+    # processes spread out over the tree instead of repeating the same work
+    engine.depth_offset = helper_id % 2
+
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            root_fen, moves, limits, generation, search_id = job
+            board = chess.Board(root_fen)
+            for move in moves:
+                board.push_uci(move)
+            engine.transposition_table.generation = generation
+            engine.search(board, limits)
+            results.put((search_id, engine.nodes_searched))
+    finally:
+        engine.transposition_table.close()
+
+
+class HelperPool:
+    """Helper processes that search the same root as the main search (Lazy SMP).
+
+    The helpers never report moves; they only fill the shared transposition
+    table, which lets the main search reach each depth sooner.
+    """
+    def __init__(self, num_helpers: int, depth: int, hash_mb: int, tt_name: str):
+        context = multiprocessing.get_context()
+        self.stop_flag = context.Value('b', 0, lock=False)
+        self.results = context.Queue()
+        self.job_queues = []
+        self.processes = []
+        self.busy = 0
+        self.search_id = 0  # tags jobs and results, so a late result isn't taken for a later search's
+        for helper_id in range(num_helpers):
+            jobs = context.Queue()
+            process = context.Process(
+                target=_helper_main,
+                args=(helper_id, depth, hash_mb, tt_name, self.stop_flag, jobs, self.results),
+                daemon=True)
+            process.start()
+            self.job_queues.append(jobs)
+            self.processes.append(process)
+
+    def start(self, board: chess.Board, limits, generation: int):
+        """Send the root position to every helper"""
+        root_fen = board.root().fen()
+        moves: List[str] = [move.uci() for move in board.move_stack]
+        self.stop_flag.value = 0
+        self.search_id += 1
+        for jobs in self.job_queues:
+            jobs.put((root_fen, moves, limits, generation, self.search_id))
+        self.busy = len(self.job_queues)
+
+    def stop(self) -> int:
+        """Stop the helpers, wait for them to finish and return their total node count"""
+        self.stop_flag.value = 1
+        nodes = 0
+        while self.busy:
+            try:
+                search_id, helper_nodes = self.results.get(timeout=HELPER_STOP_TIMEOUT)
+            except queue.Empty:
+                break
+            # Results of a helper that missed an earlier stop's timeout are dropped
+            if search_id == self.search_id:
+                nodes += helper_nodes
+                self.busy -= 1
+        self.busy = 0
+        return nodes
+
+    def close(self):
+        """Shut down the helper processes"""
+        self.stop()
+        for jobs in self.job_queues:
+            jobs.put(None)
+        for process in self.processes:
+            process.join(HELPER_STOP_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        self.job_queues = []
@@ -2,7 +2,11 @@ import pygame
 import chess
 from puzzle_mode import PuzzleSystem
 from opening_trainer import OpeningTrainer
-from chess_engine import ChessEngine
+from chess_engine import SearchLimits, MATE_SCORE, MATE_BOUND
+from engine_pool import EnginePool
+from opening_book import DEFAULT_BOOK_PATH
+from analysis_cache import AnalysisCache
+import os
 import random
 
 class ChessTrainer:
@@ -28,7 +32,26 @@ class ChessTrainer:
         
         self.puzzle_system = PuzzleSystem()
         self.opening_trainer = OpeningTrainer()
-        self.chess_engine = None  # Will be initialized when difficulty is chosen
+        self.chess_engine = None  # Taken from the engine pool when difficulty is chosen
+        self.search_handle = None  # Background search while the bot is thinking
+        self.last_search_stats = None  # Statistics of the bot's last completed search
+        self.bot_move_time = 5  # Seconds the bot may think per move
+        self.engine_threads = 1  # Processes used by the bot's search
+        self.ponder_enabled = True  # Let the bot think about its next move during the player's turn
+        self.ponder_handle = None  # Background search of the position after the expected reply
+        self.ponder_move = None  # The player's reply the bot expects
+        self.analysis_cache = AnalysisCache()  # Bot analysis kept between sessions, shared by all levels
+        self.hint_handle = None  # Background search for a hint in bot games
+        self.bot_hint_square = None
+        self.bot_hint_lines = []  # (move, description) of the best moves, best first
+        self.hint_line_count = 3  # Moves ranked by a hint
+        self.hint_move_time = 1  # Seconds spent on a hint
+        self.move_feedback = None  # How the player's last move ranked among the hint's moves
+        # One engine per difficulty, built up front and reused by every game
+        book_path = DEFAULT_BOOK_PATH if os.path.exists(DEFAULT_BOOK_PATH) else None
+        self.engine_pool = EnginePool(threads=self.engine_threads, book_path=book_path,
+                                      analysis_cache=self.analysis_cache)
+        self.engine_pool.warm([2, 3, 4])
         
         # Game states: 'menu', 'puzzle', 'opening', 'bot', 'difficulty_select', 'opening_select', 'puzzle_select', 'theme_select'
         self.current_state = 'menu'
@@ -115,6 +138,8 @@ class ChessTrainer:
         self.hint_button_rect = pygame.Rect(self.screen_size + 100, self.screen_size - 240, 200, 40)
         self.colors['hint'] = (255, 223, 0, 150)  # Yellow with transparency
         
+        self.clock = pygame.time.Clock()
+        
         self.load_assets()
         
     def load_assets(self):
@@ -192,9 +217,14 @@ class ChessTrainer:
                 self.screen.blit(s, (file * self.square_size, (7-rank) * self.square_size))
 
         # Draw hint square if exists
-        if self.current_state == 'puzzle' and self.puzzle_system.hint_square is not None:
-            file = chess.square_file(self.puzzle_system.hint_square)
-            rank = chess.square_rank(self.puzzle_system.hint_square)
+        hint_square = None
+        if self.current_state == 'puzzle':
+            hint_square = self.puzzle_system.hint_square
+        elif self.current_state == 'bot':
+            hint_square = self.bot_hint_square
+        if hint_square is not None:
+            file = chess.square_file(hint_square)
+            rank = chess.square_rank(hint_square)
             if self.board_flipped:
                 file = 7 - file
                 rank = 7 - rank
@@ -314,7 +344,10 @@ class ChessTrainer:
         for depth in [2, 3, 4]:
             rect_name = f'difficulty_{depth}_rect'
             if hasattr(self, rect_name) and getattr(self, rect_name).collidepoint(pos):
-                self.chess_engine = ChessEngine(depth)
+                self.stop_bot_search()
+                self.chess_engine = self.engine_pool.acquire(depth)
+                self.move_feedback = None
+                self.last_search_stats = None
                 self.current_state = 'bot'
                 self.board.reset()
                 self.board_flipped = False  # Player is always White
@@ -437,10 +470,33 @@ class ChessTrainer:
             self.screen.blit(difficulty_text, (self.screen_size + 20, 20))
         
         # Draw turn indicator
-        turn_text = self.menu_font.render("Your turn" if self.board.turn else "Bot's turn", 
-                                        True, (0, 0, 0))
+        if self.board.turn:
+            turn_message = "Your turn"
+        elif self.search_handle and self.search_handle.last_info:
+            turn_message = f"Bot is thinking... (depth {self.search_handle.last_info.depth})"
+        else:
+            turn_message = "Bot's turn"
+        turn_text = self.menu_font.render(turn_message, True, (0, 0, 0))
         self.screen.blit(turn_text, (self.screen_size + 20, 60))
         
+        # Draw where the search spends its effort
+        stats = self.last_search_stats
+        if self.search_handle and self.search_handle.last_info:
+            stats = self.search_handle.last_info.stats
+        if stats and stats.book_move:
+            book_text = self.description_font.render("Opening book move", True, (60, 60, 60))
+            self.screen.blit(book_text, (self.screen_size + 20, 150))
+        elif stats:
+            stats_lines = [
+                f"{stats.total_nodes} nodes, {stats.nps} nodes/s",
+                f"Quiescence {stats.quiescence_share:.0%}, TT hits {stats.tt_hit_rate:.0%}",
+                f"First move cutoffs {stats.first_move_cutoff_rate:.0%}, "
+                f"branching {stats.effective_branching_factor:.1f}",
+            ]
+            for i, line in enumerate(stats_lines):
+                stats_text = self.description_font.render(line, True, (60, 60, 60))
+                self.screen.blit(stats_text, (self.screen_size + 20, 150 + i * 25))
+        
         # Draw game end message if exists
         if self.game_end_message:
             current_time = pygame.time.get_ticks()
@@ -448,6 +504,22 @@ class ChessTrainer:
                 message_color = (0, 150, 0) if "won" in self.game_end_message.lower() else (150, 0, 0)
                 end_text = self.menu_font.render(self.game_end_message, True, message_color)
                 self.screen.blit(end_text, (self.screen_size + 20, 100))
+        
+        # Draw the hint's ranked moves and how the player's last move compared
+        for i, (_, line) in enumerate(self.bot_hint_lines):
+            line_text = self.description_font.render(f"{i + 1}. {line}", True, (60, 60, 60))
+            self.screen.blit(line_text, (self.screen_size + 20, 250 + i * 25))
+        if self.move_feedback:
+            feedback_text = self.description_font.render(self.move_feedback, True, (0, 0, 0))
+            self.screen.blit(feedback_text, (self.screen_size + 20, 250 + self.hint_line_count * 25))
+        
+        # Draw hint button on the player's turn
+        if self.board.turn and not self.waiting_for_computer and not self.board.is_game_over():
+            pygame.draw.rect(self.screen, (101, 67, 33), self.hint_button_rect)
+            hint_label = "Thinking..." if self.hint_handle else "Show Hint"
+            hint_text = self.menu_font.render(hint_label, True, (240, 217, 181))
+            hint_rect = hint_text.get_rect(center=self.hint_button_rect.center)
+            self.screen.blit(hint_text, hint_rect)
 
     def handle_event(self, event):
         if event.type == pygame.MOUSEBUTTONDOWN:
@@ -455,6 +527,7 @@ class ChessTrainer:
                 if self.current_state in ['opening', 'puzzle', 'bot']:
                     if event.pos[0] >= self.screen_size:  # Click is in side panel
                         if self.return_button_rect.collidepoint(event.pos):
+                            self.stop_bot_search()
                             self.current_state = 'menu'
                             self.board.reset()
                             self.puzzle_system.clear_completion()
@@ -479,6 +552,11 @@ class ChessTrainer:
                               self.hint_button_rect.collidepoint(event.pos)):
                             self.puzzle_system.hint_square = self.puzzle_system.get_hint()
                             return
+                        elif (self.current_state == 'bot' and
+                              self.board.turn and not self.waiting_for_computer and
+                              self.hint_button_rect.collidepoint(event.pos)):
+                            self.request_bot_hint()
+                            return
                         return  # Ignore other clicks in side panel
                 
                 # Only allow moves if puzzle is not completed
@@ -561,6 +639,9 @@ class ChessTrainer:
                         elif self.current_state == 'bot':
                             # Only handle player's moves (White)
                             if self.board.turn:  # White's turn
+                                self.move_feedback = self.rate_move(move)
+                                self.stop_hint_search()
+                                self.resolve_ponder(move)
                                 sound_type = 'capture' if self.board.piece_at(target_square) else 'move'
                                 self.board.push(move)
                                 self.play_sound(sound_type)
@@ -603,8 +684,130 @@ class ChessTrainer:
             if self.dragging:
                 self.dragged_pos = event.pos
 
+    def handle_bot_move(self):
+        """Search the bot's move in the background and play it once the search is done"""
+        if self.search_handle is None:
+            if self.board.is_game_over():
+                self.waiting_for_computer = False
+                return
+            self.search_handle = self.chess_engine.start_search(
+                self.board, SearchLimits(movetime=self.bot_move_time))
+            return
+        
+        self.search_handle.poll()
+        current_time = pygame.time.get_ticks()
+        if self.search_handle.is_done() and current_time - self.last_move_time >= self.computer_move_delay:
+            self.search_handle.poll()
+            info = self.search_handle.last_info
+            move = self.search_handle.best_move
+            self.last_search_stats = self.search_handle.stats
+            self.search_handle = None
+            self.waiting_for_computer = False
+            if move and move in self.board.legal_moves:
+                sound_type = 'capture' if self.board.is_capture(move) else 'move'
+                self.board.push(move)
+                self.play_sound(sound_type)
+                if self.board.is_check():
+                    self.play_sound('check')
+                self.check_game_end()
+                # The second move of the principal variation is the reply the bot expects
+                if self.ponder_enabled and info and len(info.pv) > 1 and info.pv[0] == move:
+                    self.start_pondering(info.pv[1])
+
+    def start_pondering(self, expected_move):
+        """Search the position after the player's expected reply while the player thinks"""
+        if self.board.is_game_over() or expected_move not in self.board.legal_moves:
+            return
+        board = self.board.copy()
+        board.push(expected_move)
+        self.ponder_move = expected_move
+        self.ponder_handle = self.chess_engine.start_search(
+            board, SearchLimits(movetime=self.bot_move_time, ponder=True))
+
+    def resolve_ponder(self, move):
+        """Keep the pondering search as the bot's search if the player played the expected move"""
+        if self.ponder_handle is None:
+            return
+        if move == self.ponder_move:
+            # Ponderhit: the time already spent pondering counts toward the bot's move
+            self.ponder_handle.ponderhit()
+            self.search_handle = self.ponder_handle
+            self.ponder_handle = None
+            self.ponder_move = None
+        else:
+            self.stop_pondering()
+
+    def stop_pondering(self):
+        """Cancel the pondering search, if any"""
+        if self.ponder_handle:
+            self.ponder_handle.stop()
+            self.ponder_handle.wait()
+            self.ponder_handle = None
+        self.ponder_move = None
+
+    def request_bot_hint(self):
+        """Rank the player's best moves with the bot's engine in the background"""
+        if self.hint_handle is None and self.chess_engine and not self.board.is_game_over():
+            # The engine runs one search at a time, and the hint matters more now
+            self.stop_pondering()
+            self.hint_handle = self.chess_engine.start_search(
+                self.board, SearchLimits(movetime=self.hint_move_time), multipv=self.hint_line_count)
+
+    def update_bot_hint(self):
+        """Show the hint once its search is done"""
+        if self.hint_handle.is_done():
+            lines = self.hint_handle.lines
+            self.hint_handle = None
+            if lines:
+                self.bot_hint_square = lines[0].pv[0].from_square
+                self.bot_hint_lines = [(line.pv[0], f"{self.board.san(line.pv[0])} ({self.format_score(line.score)})")
+                                       for line in lines]
+
+    def format_score(self, score):
+        """Score in pawns from the player's point of view, or moves to mate"""
+        if abs(score) > MATE_BOUND:
+            moves = (MATE_SCORE - abs(score) + 1) // 2
+            return f"mate in {moves}" if score > 0 else f"mated in {moves}"
+        return f"{score / 100:+.2f}"
+
+    def rate_move(self, move):
+        """Feedback on a player move that was ranked by the last hint"""
+        ranked = [hint_move for hint_move, _ in self.bot_hint_lines]
+        if not ranked:
+            return None
+        if move not in ranked:
+            return f"Not one of the top {len(ranked)} moves"
+        rank = ranked.index(move) + 1
+        if rank == 1:
+            return "You played the best move!"
+        suffix = {2: "nd", 3: "rd"}.get(rank, "th")
+        return f"You played the {rank}{suffix} best move"
+
+    def stop_hint_search(self):
+        """Cancel a running hint search and clear the hint"""
+        if self.hint_handle:
+            self.hint_handle.stop()
+            self.hint_handle.wait()
+            self.hint_handle = None
+        self.bot_hint_square = None
+        self.bot_hint_lines = []
+
+    def stop_bot_search(self):
+        """Cancel the bot's background searches, if any"""
+        self.stop_hint_search()
+        self.stop_pondering()
+        if self.search_handle:
+            self.search_handle.stop()
+            self.search_handle.wait()
+            self.search_handle = None
+        self.waiting_for_computer = False
+
     def handle_computer_move(self):
         """Handle computer's move in puzzle or bot mode"""
+        if self.current_state == 'bot':
+            self.handle_bot_move()
+            return
+        
         current_time = pygame.time.get_ticks()
         if self.waiting_for_computer and current_time - self.last_move_time >= self.computer_move_delay:
             if self.current_state == 'puzzle':
@@ -837,6 +1040,8 @@ class ChessTrainer:
             # Handle computer moves
             if self.waiting_for_computer:
                 self.handle_computer_move()
+            if self.hint_handle:
+                self.update_bot_hint()
             
             self.screen.fill((255, 255, 255))
             
@@ -863,7 +1068,12 @@ class ChessTrainer:
                     self.draw_promotion_dialog()
             
             pygame.display.flip()
+            # Cap the frame rate so the bot's search thread gets CPU time
+            self.clock.tick(60)
         
+        self.stop_bot_search()
+        self.engine_pool.close()
+        self.analysis_cache.close()
         pygame.quit()
 
 if __name__ == "__main__":
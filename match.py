@@ -0,0 +1,268 @@
+import argparse
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+import chess
+import chess.pgn
+from typing import Dict, Iterator, List, Optional, Tuple
+from chess_engine import ChessEngine, SearchLimits, LEVELS
+
+DEFAULT_MOVETIME = 0.2  # seconds per move when no limit is given
+MAX_PLIES = 300  # longer games are adjudicated as draws
+DEFAULT_RANDOM_PLIES = 2  # random moves added to every opening for variety
+# SPRT defaults: H0 elo <= ELO0 against H1 elo >= ELO1 with these error rates
+DEFAULT_ELO0 = 0.0
+DEFAULT_ELO1 = 50.0
+DEFAULT_ALPHA = 0.05
+DEFAULT_BETA = 0.05
+
+# Engines of the current worker process by (level, color), kept between games
+_engines: Dict[Tuple[str, chess.Color], ChessEngine] = {}
+
+
+def trainer_openings() -> List[Tuple[str, List[str]]]:
+    """(name, UCI moves) of every Opening Trainer line"""
+    # The trainer imports pygame, whose banner would end up among the results on stdout
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    from opening_trainer import OpeningTrainer
+    return [(opening["name"], opening["moves"]) for opening in OpeningTrainer().openings.values()]
+
+
+def book_openings(path: str, count: int, max_plies: int = 8, seed: int = 0) -> List[Tuple[str, List[str]]]:
+    """Up to count distinct lines found by walking a Polyglot book with weighted random choices"""
+    from opening_book import OpeningBook
+    book = OpeningBook(path, seed)
+    lines = {}
+    for _ in range(count * 10):
+        board = chess.Board()
+        while len(board.move_stack) < max_plies:
+            move = book.choose_move(board)
+            if move is None:
+                break
+            board.push(move)
+        if board.move_stack:
+            moves = [move.uci() for move in board.move_stack]
+            lines[" ".join(moves)] = moves
+        if len(lines) >= count:
+            break
+    book.close()
+    return [(f"book {i + 1}", moves) for i, moves in enumerate(lines.values())]
+
+
+def extend_openings(openings: List[Tuple[str, List[str]]], pairs: int, random_plies: int,
+                    seed: int = 0) -> List[Tuple[str, List[str]]]:
+    """One opening per game pair, cycling through the set and adding random legal moves"""
+    rng = random.Random(seed)
+    result = []
+    for pair in range(pairs):
+        name, moves = openings[pair % len(openings)]
+        board = chess.Board()
+        for move in moves:
+            board.push_uci(move)
+        for _ in range(random_plies):
+            legal_moves = list(board.legal_moves)
+            if not legal_moves or board.is_game_over():
+                break
+            board.push(rng.choice(legal_moves))
+        result.append((name, [move.uci() for move in board.move_stack]))
+    return result
+
+
+def _get_engine(level: str, color: chess.Color, hash_mb: int) -> ChessEngine:
+    engine = _engines.get((level, color))
+    if engine is None:
+        engine = ChessEngine(LEVELS[level], hash_mb=hash_mb)
+        _engines[(level, color)] = engine
+    engine.new_game()
+    return engine
+
+
+def play_game(task: Tuple[int, str, str, str, List[str], SearchLimits, int]) -> Dict:
+    """Play one game in a worker process and return its result and PGN"""
+    game_id, white, black, opening, moves, limits, hash_mb = task
+    engines = {chess.WHITE: _get_engine(white, chess.WHITE, hash_mb),
+               chess.BLACK: _get_engine(black, chess.BLACK, hash_mb)}
+    board = chess.Board()
+    for move in moves:
+        board.push_uci(move)
+
+    termination = None
+    while termination is None:
+        outcome = board.outcome(claim_draw=True)
+        if outcome:
+            termination = outcome.termination.name.lower().replace("_", " ")
+            result = outcome.result()
+        elif len(board.move_stack) >= MAX_PLIES:
+            termination = "max plies"
+            result = "1/2-1/2"
+        else:
+            move = engines[board.turn].search(board, limits)
+            if move is None or move not in board.legal_moves:
+                # An engine failing to move loses the game
+                termination = "illegal move"
+                result = "0-1" if board.turn == chess.WHITE else "1-0"
+            else:
+                board.push(move)
+
+    game = chess.pgn.Game.from_board(board)
+    game.headers["Event"] = "ChessTrainer engine match"
+    game.headers["Round"] = str(game_id + 1)
+    game.headers["White"] = white
+    game.headers["Black"] = black
+    game.headers["Result"] = result
+    game.headers["Opening"] = opening
+    game.headers["Termination"] = termination
+    exporter = chess.pgn.StringExporter(headers=True, variations=False, comments=False)
+    return {"game": game_id, "white": white, "black": black, "result": result,
+            "termination": termination, "plies": len(board.move_stack), "pgn": game.accept(exporter)}
+
+
+def elo_difference(wins: int, draws: int, losses: int) -> Tuple[float, float]:
+    """Elo difference and its 95% error margin from a score"""
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0, 0.0
+    score = (wins + draws / 2) / games
+    if score <= 0 or score >= 1:
+        return (-math.inf if score <= 0 else math.inf), math.inf
+    elo = -400 * math.log10(1 / score - 1)
+    # Standard deviation of the per-game score, propagated through the Elo curve
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    deviation = math.sqrt(variance / games)
+    derivative = 400 / (math.log(10) * score * (1 - score))
+    return elo, 1.96 * deviation * derivative
+
+
+def sprt_llr(wins: int, draws: int, losses: int, elo0: float, elo1: float) -> float:
+    """Log-likelihood ratio of H1 (elo >= elo1) against H0 (elo <= elo0), normal approximation"""
+    if wins + draws + losses == 0:
+        return 0.0
+    if not (wins and draws and losses):
+        # Outcomes that haven't occurred yet would make the variance zero
+        wins, draws, losses = wins + 0.5, draws + 0.5, losses + 0.5
+    games = wins + draws + losses
+    score = (wins + draws / 2) / games
+    variance = (wins + draws / 4) / games - score ** 2
+    score0 = 1 / (1 + 10 ** (-elo0 / 400))
+    score1 = 1 / (1 + 10 ** (-elo1 / 400))
+    return games * (score1 - score0) * (2 * score - score0 - score1) / (2 * variance)
+
+
+def sprt_bounds(alpha: float, beta: float) -> Tuple[float, float]:
+    """LLR values at which H0 is accepted (lower) or H1 is accepted (upper)"""
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def schedule(engine_a: str, engine_b: str, openings: List[Tuple[str, List[str]]], limits: SearchLimits,
+             hash_mb: int) -> Iterator[Tuple[int, str, str, str, List[str], SearchLimits, int]]:
+    """Every opening twice, with engine_a playing White first and Black second"""
+    for pair, (name, moves) in enumerate(openings):
+        yield 2 * pair, engine_a, engine_b, name, moves, limits, hash_mb
+        yield 2 * pair + 1, engine_b, engine_a, name, moves, limits, hash_mb
+
+
+def run_match(engine_a: str, engine_b: str, games: int, limits: SearchLimits,
+              openings: List[Tuple[str, List[str]]], workers: Optional[int] = None, hash_mb: int = 16,
+              sprt: Optional[Tuple[float, float, float, float]] = None, pgn_file=None,
+              progress: bool = True) -> Dict:
+    """Play games between two levels in parallel; scores are from engine_a's point of view.
+
+    With sprt = (elo0, elo1, alpha, beta) the match stops as soon as the
+    sequential probability ratio test accepts either hypothesis.
+    """
+    pairs = extend_openings(openings, (games + 1) // 2, 0)
+    wins = draws = losses = 0
+    llr = 0.0
+    decision = None
+    lower, upper = sprt_bounds(sprt[2], sprt[3]) if sprt else (0.0, 0.0)
+    start = time.perf_counter()
+    tasks = list(schedule(engine_a, engine_b, pairs, limits, hash_mb))[:games]
+    context = multiprocessing.get_context()
+    with context.Pool(workers or os.cpu_count() or 1) as pool:
+        for game in pool.imap_unordered(play_game, tasks):
+            a_is_white = game["game"] % 2 == 0
+            if game["result"] == "1/2-1/2":
+                draws += 1
+            elif (game["result"] == "1-0") == a_is_white:
+                wins += 1
+            else:
+                losses += 1
+            if pgn_file:
+                print(game["pgn"], file=pgn_file, end="\n\n", flush=True)
+            if sprt:
+                llr = sprt_llr(wins, draws, losses, sprt[0], sprt[1])
+                if llr <= lower:
+                    decision = "H0"
+                elif llr >= upper:
+                    decision = "H1"
+            if progress:
+                elo, margin = elo_difference(wins, draws, losses)
+                line = f"\r{wins + draws + losses}/{len(tasks)} +{wins} ={draws} -{losses}  elo {elo:+.0f} +/- {margin:.0f}"
+                if sprt:
+                    line += f"  llr {llr:.2f} [{lower:.2f}, {upper:.2f}]"
+                print(line, end="", file=sys.stderr, flush=True)
+            if decision:
+                pool.terminate()
+                break
+    if progress:
+        print(file=sys.stderr)
+    elo, margin = elo_difference(wins, draws, losses)
+    return {"engines": [engine_a, engine_b], "games": wins + draws + losses, "wins": wins, "draws": draws,
+            "losses": losses, "elo": elo, "margin": margin, "llr": llr if sprt else None,
+            "sprt": decision, "time": round(time.perf_counter() - start, 2)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Play engine-vs-engine games between difficulty levels")
+    parser.add_argument("engine_a", choices=list(LEVELS))
+    parser.add_argument("engine_b", choices=list(LEVELS))
+    parser.add_argument("--games", type=int, default=100, help="maximum number of games (default %(default)s)")
+    parser.add_argument("--movetime", type=float, help=f"seconds per move (default {DEFAULT_MOVETIME})")
+    parser.add_argument("--nodes", type=int, help="node budget per move")
+    parser.add_argument("--depth", type=int, help="search depth per move")
+    parser.add_argument("--workers", type=int, help="games played at once (default: one per CPU)")
+    parser.add_argument("--hash", type=int, default=16, help="transposition table MB per engine (default %(default)s)")
+    parser.add_argument("--book", metavar="FILE", help="draw openings from a Polyglot book instead of the trainer lines")
+    parser.add_argument("--random-plies", type=int, default=DEFAULT_RANDOM_PLIES,
+                        help="random moves added after every opening (default %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the openings (default %(default)s)")
+    parser.add_argument("--pgn", metavar="FILE", help="append the games to FILE")
+    parser.add_argument("--sprt", action="store_true", help="stop early once an SPRT decides")
+    parser.add_argument("--elo0", type=float, default=DEFAULT_ELO0, help="SPRT H0 elo (default %(default)s)")
+    parser.add_argument("--elo1", type=float, default=DEFAULT_ELO1, help="SPRT H1 elo (default %(default)s)")
+    parser.add_argument("--alpha", type=float, default=DEFAULT_ALPHA, help="SPRT false positive rate")
+    parser.add_argument("--beta", type=float, default=DEFAULT_BETA, help="SPRT false negative rate")
+    args = parser.parse_args(argv)
+
+    movetime = args.movetime
+    if movetime is None and args.nodes is None and args.depth is None:
+        movetime = DEFAULT_MOVETIME
+    limits = SearchLimits(depth=args.depth, movetime=movetime, nodes=args.nodes)
+
+    pairs = (args.games + 1) // 2
+    openings = book_openings(args.book, pairs, seed=args.seed) if args.book else trainer_openings()
+    openings = extend_openings(openings, pairs, args.random_plies, args.seed)
+    sprt = (args.elo0, args.elo1, args.alpha, args.beta) if args.sprt else None
+
+    pgn_file = open(args.pgn, "a") if args.pgn else None
+    try:
+        result = run_match(args.engine_a, args.engine_b, args.games, limits, openings,
+                           args.workers, args.hash, sprt, pgn_file)
+    finally:
+        if pgn_file:
+            pgn_file.close()
+
+    print(f"{args.engine_a} vs {args.engine_b}: +{result['wins']} ={result['draws']} -{result['losses']} "
+          f"in {result['games']} games ({result['time']}s)")
+    print(f"elo difference {result['elo']:+.1f} +/- {result['margin']:.1f}")
+    if sprt:
+        verdict = {"H1": f"H1 accepted (elo >= {args.elo1})", "H0": f"H0 accepted (elo <= {args.elo0})"}
+        print(f"SPRT llr {result['llr']:.2f}: {verdict.get(result['sprt'], 'inconclusive')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+import chess
+from typing import Callable, Dict, List, Optional, Tuple
+from search_board import SearchBoard
+
+# The mate search never evaluates, so its boards carry all-zero score tables
+_ZERO_TABLE = [[[0] * 64 for _ in range(7)] for _ in range(2)]
+DEFAULT_NODE_LIMIT = 200000
+CHECK_INTERVAL = 256  # nodes between calls of check_limits
+
+
+class MateSearchAborted(Exception):
+    """Raised inside the mate search when the node limit is reached"""
+
+
+class MateSearch:
+    """Depth-limited search for forced mates.
+
+    The attacker tries checks first, then captures, then quiet moves (skipped
+    with checks_only=True); the defender tries every legal move. Iterative
+    deepening on the number of attacker moves makes the first mate found the
+    shortest one. Proven and refuted positions are remembered by Zobrist key.
+
+    check_limits, if given, is called with the node count every CHECK_INTERVAL
+    nodes; an exception it raises (e.g. on a stop or deadline) ends the search
+    and propagates to the caller.
+    """
+    def __init__(self, node_limit: int = DEFAULT_NODE_LIMIT, checks_only: bool = False,
+                 check_limits: Optional[Callable[[int], None]] = None):
+        self.node_limit = node_limit
+        self.checks_only = checks_only
+        self.check_limits = check_limits
+        self.nodes = 0
+        self.aborted = False
+        self.mates: Dict[int, Tuple[int, chess.Move]] = {}  # key -> (attacker moves, mating move)
+        self.no_mate: Dict[int, int] = {}  # key -> attacker moves known not to be enough
+        self.refutations: Dict[int, chess.Move] = {}  # defender move that last escaped the mate
+
+    def find_mate(self, board: chess.Board, max_moves: int) -> Optional[Tuple[int, List[chess.Move]]]:
+        """Shortest forced mate for the side to move in at most max_moves moves.
+
+        Returns (moves to mate, principal variation), or None if there is no
+        such mate or the node limit ran out first (then aborted is set).
+        """
+        position = SearchBoard(board, _ZERO_TABLE, _ZERO_TABLE)
+        self.nodes = 0
+        self.aborted = False
+        try:
+            for moves in range(1, max_moves + 1):
+                if self._attack(position, moves):
+                    break
+            else:
+                return None
+        except MateSearchAborted:
+            self.aborted = True
+            return None
+        # Most of the line is already proven, so it is extracted without a node limit
+        node_limit, self.node_limit = self.node_limit, float('inf')
+        try:
+            return moves, self._principal_variation(position, moves)
+        finally:
+            self.node_limit = node_limit
+
+    def is_forced_mate(self, board: chess.Board, move: chess.Move, max_moves: int) -> bool:
+        """Whether move forces mate in at most max_moves moves, counting move itself"""
+        position = SearchBoard(board, _ZERO_TABLE, _ZERO_TABLE)
+        position.push(move)
+        self.nodes = 0
+        self.aborted = False
+        try:
+            return self._defend(position, max_moves - 1)
+        except MateSearchAborted:
+            self.aborted = True
+            return False
+
+    def _ordered_moves(self, board: SearchBoard, moves_left: int) -> List[chess.Move]:
+        """Attacker moves worth trying: checks, then captures, then quiet moves"""
+        checks = []
+        captures = []
+        quiet = []
+        for move in board.generate_legal_moves():
+            board.push(move)
+            gives_check = board.is_check()
+            board.pop()
+            if gives_check:
+                checks.append(move)
+            elif moves_left > 1 and not self.checks_only:
+                if board.is_capture(move) or move.promotion:
+                    captures.append(move)
+                else:
+                    quiet.append(move)
+        return checks + captures + quiet
+
+    def _attack(self, board: SearchBoard, moves_left: int) -> Optional[chess.Move]:
+        """A move of the side to move that mates in at most moves_left moves, or None"""
+        self.nodes += 1
+        if self.nodes > self.node_limit:
+            raise MateSearchAborted()
+        if self.check_limits is not None and self.nodes % CHECK_INTERVAL == 0:
+            self.check_limits(self.nodes)
+        key = board.key
+        known = self.mates.get(key)
+        if known and known[0] <= moves_left:
+            return known[1]
+        if self.no_mate.get(key, 0) >= moves_left:
+            return None
+
+        for move in self._ordered_moves(board, moves_left):
+            board.push(move)
+            mated = self._defend(board, moves_left - 1)
+            board.pop()
+            if mated:
+                self.mates[key] = (moves_left, move)
+                return move
+        self.no_mate[key] = moves_left
+        return None
+
+    def _defend(self, board: SearchBoard, moves_left: int) -> bool:
+        """Whether the side to move is mated now or within moves_left attacker moves whatever it plays"""
+        moves = board.generate_legal_moves()
+        if not moves:
+            return board.is_check()
+        if moves_left == 0:
+            return False
+
+        # The move that escaped last time is the most likely to escape again
+        refutation = self.refutations.get(board.key)
+        if refutation in moves:
+            moves.remove(refutation)
+            moves.insert(0, refutation)
+        for move in moves:
+            board.push(move)
+            mated = self._attack(board, moves_left) is not None
+            board.pop()
+            if not mated:
+                self.refutations[board.key] = move
+                return False
+        return True
+
+    def _principal_variation(self, board: SearchBoard, moves_left: int) -> List[chess.Move]:
+        """Mating line in which the defender always delays the mate the longest"""
+        pv = []
+        while moves_left > 0:
+            move = self._attack(board, moves_left)
+            board.push(move)
+            pv.append(move)
+            replies = board.generate_legal_moves()
+            if not replies:
+                break
+            # Longest resistance: the reply after which the mate takes the most moves
+            longest, reply = 0, replies[0]
+            for candidate in replies:
+                board.push(candidate)
+                for needed in range(1, moves_left):
+                    if self._attack(board, needed):
+                        break
+                board.pop()
+                if needed > longest:
+                    longest, reply = needed, candidate
+            board.push(reply)
+            pv.append(reply)
+            moves_left = longest
+        for _ in pv:
+            board.pop()
+        return pv
@@ -0,0 +1,161 @@
+import argparse
+import os
+import random
+import struct
+import sys
+import chess
+import chess.pgn
+import chess.polyglot
+from typing import Dict, Iterable, List, Optional, Tuple
+from zobrist import zobrist_key
+
+# Book built from the opening trainer's lines, used by the bot when present
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+# Polyglot entry: key, move, weight, learn (big-endian, 16 bytes)
+ENTRY_STRUCT = struct.Struct(">QHHI")
+MAX_WEIGHT = 0xFFFF
+TRAINER_WEIGHT = 10  # weight of every move of a trainer opening line
+DEFAULT_MAX_PLY = 20  # PGN moves beyond this ply are not added
+
+
+class OpeningBook:
+    """Polyglot opening book.
+
+    The file is memory mapped and positions are found by binary search on
+    their Zobrist key, so opening a large book costs nothing until it's probed.
+    """
+    def __init__(self, path: str, seed: Optional[int] = None):
+        self.path = path
+        self.reader = chess.polyglot.open_reader(path)
+        self.random = random.Random(seed)
+
+    def __len__(self) -> int:
+        return len(self.reader)
+
+    def get_moves(self, board: chess.Board) -> List[Tuple[chess.Move, int]]:
+        """Legal book moves for the position with their weights"""
+        return [(entry.move, entry.weight) for entry in self.reader.find_all(board)
+                if board.is_legal(entry.move)]
+
+    def choose_move(self, board: chess.Board) -> Optional[chess.Move]:
+        """Pick a book move at random in proportion to its weight, or None if the position is not in the book"""
+        moves = self.get_moves(board)
+        if not moves:
+            return None
+        return self.random.choices([move for move, _ in moves], [weight for _, weight in moves])[0]
+
+    def close(self):
+        self.reader.close()
+
+
+def encode_move(board: chess.Board, move: chess.Move) -> int:
+    """Polyglot move encoding; castling is written as the king taking its own rook"""
+    to_square = move.to_square
+    if board.is_castling(move):
+        rook_file = 7 if chess.square_file(move.to_square) > chess.square_file(move.from_square) else 0
+        to_square = chess.square(rook_file, chess.square_rank(move.from_square))
+    promotion = move.promotion - 1 if move.promotion else 0
+    return to_square | (move.from_square << 6) | (promotion << 12)
+
+
+class BookBuilder:
+    """Collects weighted moves per position and writes them as a Polyglot book"""
+    def __init__(self):
+        # (Zobrist key, encoded move) -> weight
+        self.weights: Dict[Tuple[int, int], int] = {}
+
+    def add_move(self, board: chess.Board, move: chess.Move, weight: int):
+        if weight > 0:
+            entry = (zobrist_key(board), encode_move(board, move))
+            self.weights[entry] = self.weights.get(entry, 0) + weight
+
+    def add_line(self, moves: Iterable[str], weight: int = TRAINER_WEIGHT):
+        """Add every move of a line of UCI moves from the starting position"""
+        board = chess.Board()
+        for uci in moves:
+            move = chess.Move.from_uci(uci)
+            self.add_move(board, move, weight)
+            board.push(move)
+
+    def add_trainer_openings(self, openings: Dict[str, Dict]):
+        for opening in openings.values():
+            self.add_line(opening["moves"])
+
+    def add_pgn(self, path: str, max_ply: int = DEFAULT_MAX_PLY) -> int:
+        """Add the opening moves of every game in a PGN file and return the number of games.
+
+        As in Polyglot, a move scores 2 for the side that won the game, 1 in a
+        draw or unfinished game and nothing for the loser.
+        """
+        games = 0
+        with open(path, encoding="utf-8", errors="replace") as pgn:
+            while True:
+                game = chess.pgn.read_game(pgn)
+                if game is None:
+                    break
+                games += 1
+                result = game.headers.get("Result", "*")
+                board = game.board()
+                for ply, move in enumerate(game.mainline_moves()):
+                    if ply >= max_ply:
+                        break
+                    if result == "1-0":
+                        weight = 2 if board.turn == chess.WHITE else 0
+                    elif result == "0-1":
+                        weight = 2 if board.turn == chess.BLACK else 0
+                    else:
+                        weight = 1
+                    self.add_move(board, move, weight)
+                    board.push(move)
+        return games
+
+    def write(self, path: str) -> int:
+        """Write the book sorted by key and return the number of entries"""
+        by_key: Dict[int, List[Tuple[int, int]]] = {}
+        for (key, move), weight in self.weights.items():
+            by_key.setdefault(key, []).append((move, weight))
+
+        with open(path, "wb") as f:
+            for key in sorted(by_key):
+                moves = by_key[key]
+                # Scale down positions whose weights don't fit in 16 bits
+                heaviest = max(weight for _, weight in moves)
+                scale = MAX_WEIGHT / heaviest if heaviest > MAX_WEIGHT else 1
+                for move, weight in sorted(moves, key=lambda item: -item[1]):
+                    f.write(ENTRY_STRUCT.pack(key, move, max(1, int(weight * scale)), 0))
+        return len(self.weights)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build or probe a Polyglot opening book")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="build a book from the trainer openings and PGN files")
+    build.add_argument("--output", default=DEFAULT_BOOK_PATH, help="book file to write (default %(default)s)")
+    build.add_argument("--pgn", nargs="*", default=[], help="PGN files to add")
+    build.add_argument("--max-ply", type=int, default=DEFAULT_MAX_PLY,
+                       help="number of plies added from each PGN game (default %(default)s)")
+    build.add_argument("--no-trainer", action="store_true", help="leave out the opening trainer lines")
+    probe = subparsers.add_parser("probe", help="list the book moves of a position")
+    probe.add_argument("fen", nargs="?", default=chess.STARTING_FEN)
+    probe.add_argument("--book", default=DEFAULT_BOOK_PATH, help="book file to read (default %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        builder = BookBuilder()
+        if not args.no_trainer:
+            from opening_trainer import OpeningTrainer
+            builder.add_trainer_openings(OpeningTrainer().openings)
+        for path in args.pgn:
+            print(f"{path}: {builder.add_pgn(path, args.max_ply)} games")
+        print(f"wrote {builder.write(args.output)} entries to {args.output}")
+    else:
+        book = OpeningBook(args.book)
+        board = chess.Board(args.fen)
+        for move, weight in book.get_moves(board):
+            print(f"{board.san(move)} {weight}")
+        book.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
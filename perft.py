@@ -0,0 +1,205 @@
+import argparse
+import json
+import sys
+import time
+import chess
+from typing import Dict, List, Optional, Tuple
+from chess_engine import ChessEngine
+from puzzle_mode import CHESS_PUZZLES
+from search_board import SearchBoard, perft
+
+# Standard perft test positions: (name, fen, depth, expected nodes)
+STANDARD_POSITIONS = [
+    ("start", chess.STARTING_FEN, 4, 197281),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", 3, 97862),
+    ("position 3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", 5, 674624),
+    ("position 4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", 4, 422333),
+    ("position 5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", 3, 62379),
+    ("position 6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10", 3, 89890),
+]
+PUZZLE_DEPTH = 3
+# Allowed slowdown of the total nodes/sec against a baseline before the check fails
+DEFAULT_THRESHOLD = 0.10
+
+
+def reference_perft(board: chess.Board, depth: int) -> int:
+    """Perft with python-chess, the reference move generator"""
+    if depth <= 0:
+        return 1
+    if depth == 1:
+        return board.legal_moves.count()
+    nodes = 0
+    for move in board.legal_moves:
+        board.push(move)
+        nodes += reference_perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+
+def divide(board: SearchBoard, depth: int) -> Dict[str, int]:
+    """Perft split by root move (uci -> nodes)"""
+    counts = {}
+    for move in board.generate_legal_moves():
+        board.push(move)
+        counts[move.uci()] = perft(board, depth - 1)
+        board.pop()
+    return counts
+
+
+def reference_divide(board: chess.Board, depth: int) -> Dict[str, int]:
+    counts = {}
+    for move in board.legal_moves:
+        board.push(move)
+        counts[move.uci()] = reference_perft(board, depth - 1)
+        board.pop()
+    return counts
+
+
+def get_positions(puzzle_depth: int = PUZZLE_DEPTH) -> List[Tuple[str, str, int, Optional[int]]]:
+    """Standard positions followed by every puzzle position"""
+    positions = list(STANDARD_POSITIONS)
+    for i, puzzle in enumerate(CHESS_PUZZLES):
+        positions.append((f"puzzle {i + 1}", puzzle["fen"], puzzle_depth, None))
+    return positions
+
+
+def run_suite(positions, use_reference: bool = True) -> Dict:
+    """Run perft on every position and return the results by position name"""
+    engine = ChessEngine(2, hash_mb=0)
+    results = {}
+    for name, fen, depth, expected in positions:
+        board = SearchBoard(chess.Board(fen), engine.mg_table, engine.eg_table)
+        start = time.perf_counter()
+        nodes = perft(board, depth)
+        elapsed = time.perf_counter() - start
+        result = {
+            "fen": fen,
+            "depth": depth,
+            "nodes": nodes,
+            "time": round(elapsed, 4),
+            "nps": int(nodes / elapsed) if elapsed > 0 else 0,
+            "expected": expected,
+        }
+        if use_reference:
+            start = time.perf_counter()
+            result["reference"] = reference_perft(chess.Board(fen), depth)
+            elapsed = time.perf_counter() - start
+            result["reference_nps"] = int(result["reference"] / elapsed) if elapsed > 0 else 0
+        result["ok"] = (expected is None or nodes == expected) and result.get("reference", nodes) == nodes
+        results[name] = result
+    return results
+
+
+def summarize(results: Dict) -> Dict:
+    """Totals over all positions"""
+    nodes = sum(result["nodes"] for result in results.values())
+    elapsed = sum(result["time"] for result in results.values())
+    return {
+        "positions": len(results),
+        "nodes": nodes,
+        "time": round(elapsed, 4),
+        "nps": int(nodes / elapsed) if elapsed > 0 else 0,
+        "failures": [name for name, result in results.items() if not result["ok"]],
+    }
+
+
+def compare_to_baseline(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Return the problems found against a saved baseline (empty if none).
+
+    Speed is compared as total nodes/sec over the positions both runs share.
+    """
+    problems = []
+    nodes = old_nodes = 0
+    elapsed = old_elapsed = 0.0
+    for name, old in baseline["results"].items():
+        new = results.get(name)
+        if new is None or (new["fen"], new["depth"]) != (old["fen"], old["depth"]):
+            continue
+        if new["nodes"] != old["nodes"]:
+            problems.append(f"{name}: {new['nodes']} nodes, baseline has {old['nodes']}")
+        nodes += new["nodes"]
+        elapsed += new["time"]
+        old_nodes += old["nodes"]
+        old_elapsed += old["time"]
+    if elapsed > 0 and old_elapsed > 0:
+        nps = nodes / elapsed
+        old_nps = old_nodes / old_elapsed
+        if nps < old_nps * (1 - threshold):
+            problems.append(f"speed {nps:.0f} nps is more than {threshold:.0%} below "
+                            f"the baseline {old_nps:.0f} nps")
+    return problems
+
+
+def print_results(results: Dict, summary: Dict, baseline: Optional[Dict] = None):
+    print(f"{'position':<12} {'depth':>5} {'nodes':>10} {'nps':>10} {'ref nps':>10} {'vs base':>8}  ok")
+    for name, result in results.items():
+        ref_nps = result.get("reference_nps")
+        change = ""
+        if baseline and name in baseline["results"] and baseline["results"][name]["nps"]:
+            change = f"{result['nps'] / baseline['results'][name]['nps'] - 1:+.0%}"
+        print(f"{name:<12} {result['depth']:>5} {result['nodes']:>10} {result['nps']:>10} "
+              f"{ref_nps if ref_nps is not None else '-':>10} {change:>8}  {'yes' if result['ok'] else 'NO'}")
+    print(f"total: {summary['nodes']} nodes in {summary['time']:.2f}s, {summary['nps']} nps")
+    for name in summary["failures"]:
+        result = results[name]
+        print(f"MISMATCH {name}: {result['nodes']} nodes, expected {result['expected']}, "
+              f"reference {result.get('reference')}")
+
+
+def print_divide(fen: str, depth: int, use_reference: bool = True) -> bool:
+    """Print perft divide output for one position; return whether it matches the reference"""
+    engine = ChessEngine(2, hash_mb=0)
+    counts = divide(SearchBoard(chess.Board(fen), engine.mg_table, engine.eg_table), depth)
+    reference = reference_divide(chess.Board(fen), depth) if use_reference else counts
+    ok = True
+    for uci in sorted(set(counts) | set(reference)):
+        mark = ""
+        if counts.get(uci) != reference.get(uci):
+            mark = f"  reference {reference.get(uci)}"
+            ok = False
+        print(f"{uci}: {counts.get(uci)}{mark}")
+    print(f"\nmoves: {len(counts)}  nodes: {sum(counts.values())}")
+    return ok
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Perft correctness and move generation speed benchmark")
+    parser.add_argument("--divide", metavar="FEN", help="print the node count below each root move of FEN")
+    parser.add_argument("--depth", type=int, default=PUZZLE_DEPTH,
+                        help="depth for --divide and for the puzzle positions (default %(default)s)")
+    parser.add_argument("--no-puzzles", action="store_true", help="only run the standard positions")
+    parser.add_argument("--no-reference", action="store_true", help="skip the python-chess comparison")
+    parser.add_argument("--save-baseline", metavar="FILE", help="write the results to FILE as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed nps drop against the baseline (default %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.divide:
+        return 0 if print_divide(args.divide, args.depth, not args.no_reference) else 1
+
+    positions = STANDARD_POSITIONS if args.no_puzzles else get_positions(args.depth)
+    results = run_suite(positions, not args.no_reference)
+    summary = summarize(results)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_results(results, summary, baseline)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"results": results, "summary": summary}, f, indent=2)
+
+    failed = bool(summary["failures"])
+    if baseline:
+        problems = compare_to_baseline(results, baseline, args.threshold)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        failed = failed or bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
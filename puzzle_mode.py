@@ -1,5 +1,6 @@
 import chess
 import random
+from mate_search import MateSearch
 
 CHESS_PUZZLES = [
     {
@@ -337,6 +338,14 @@ class PuzzleSystem:
         if move.uci() == expected_move:
             self.current_move_index += 1
             return True
+        # Any checkmate finishes a mate puzzle, not only the one in the solution
+        if self.is_mate_puzzle() and self.current_move_index == len(self.current_puzzle['moves']) - 1:
+            self.board.push(move)
+            is_mate = self.board.is_checkmate()
+            self.board.pop()
+            if is_mate:
+                self.current_move_index += 1
+                return True
         return False
     
     def get_computer_response(self):
@@ -396,10 +405,27 @@ class PuzzleSystem:
         self.current_move_index = 0
         self.board = chess.Board(self.current_puzzle['fen'])
 
+    def is_mate_puzzle(self):
+        """Check if the current puzzle ends in checkmate"""
+        return bool(self.current_puzzle) and 'mate' in self.current_puzzle['themes']
+
     def get_hint(self):
-        """Get the square of the piece that needs to be moved"""
+        """Get the square of the piece that needs to be moved.
+
+        In mate puzzles the mate solver confirms that the solution move still
+        forces mate and finds a mating move if it doesn't.
+        """
         if self.current_puzzle and self.current_move_index < len(self.current_puzzle['moves']):
             move = chess.Move.from_uci(self.current_puzzle['moves'][self.current_move_index])
+            if self.is_mate_puzzle():
+                # Player moves left, including this one
+                moves_left = (len(self.current_puzzle['moves']) - self.current_move_index + 1) // 2
+                # A fresh solver per hint, so its tables don't grow across puzzles
+                mate_search = MateSearch()
+                if not mate_search.is_forced_mate(self.board, move, moves_left):
+                    mate = mate_search.find_mate(self.board, moves_left)
+                    if mate:
+                        move = mate[1][0]
             return move.from_square
         return None
 
@@ -0,0 +1,528 @@
+import chess
+import chess.polyglot
+from typing import List, Optional
+from zobrist import PIECE_KEYS, TURN_KEY, castling_key, ep_key, zobrist_key
+
+# Game phase contribution of each piece type (24 = all minor and major pieces on board)
+PHASE_WEIGHTS = [0, 0, 1, 1, 2, 4, 0]
+
+_BB_SQUARES = chess.BB_SQUARES
+_KNIGHT_ATTACKS = chess.BB_KNIGHT_ATTACKS
+_KING_ATTACKS = chess.BB_KING_ATTACKS
+_PAWN_ATTACKS = chess.BB_PAWN_ATTACKS
+_RANK_MASKS = chess.BB_RANK_MASKS
+_FILE_MASKS = chess.BB_FILE_MASKS
+_DIAG_MASKS = chess.BB_DIAG_MASKS
+_RANK_ATTACKS = chess.BB_RANK_ATTACKS
+_FILE_ATTACKS = chess.BB_FILE_ATTACKS
+_DIAG_ATTACKS = chess.BB_DIAG_ATTACKS
+_BACK_RANKS = chess.BB_RANK_1 | chess.BB_RANK_8
+_EP_KEYS = [chess.polyglot.POLYGLOT_RANDOM_ARRAY[772 + file] for file in range(8)]
+
+# Squares strictly between two squares, and the whole line through them (0 if not aligned)
+_BETWEEN = [[chess.between(a, b) for b in chess.SQUARES] for a in chess.SQUARES]
+_LINE = chess.BB_RAYS
+
+# Castling rights that survive a move from or to each square
+_CASTLING_KEEP = [chess.BB_ALL] * 64
+for _square, _lost in ((chess.A1, chess.BB_A1), (chess.H1, chess.BB_H1),
+                       (chess.E1, chess.BB_A1 | chess.BB_H1),
+                       (chess.A8, chess.BB_A8), (chess.H8, chess.BB_H8),
+                       (chess.E8, chess.BB_A8 | chess.BB_H8)):
+    _CASTLING_KEEP[_square] = chess.BB_ALL ^ _lost
+
+# (rook right, king from, king to, squares that must be empty, squares the king crosses)
+_CASTLING_MOVES = [
+    [(chess.BB_H8, chess.E8, chess.G8, chess.BB_F8 | chess.BB_G8, (chess.F8, chess.G8)),
+     (chess.BB_A8, chess.E8, chess.C8, chess.BB_B8 | chess.BB_C8 | chess.BB_D8, (chess.D8, chess.C8))],
+    [(chess.BB_H1, chess.E1, chess.G1, chess.BB_F1 | chess.BB_G1, (chess.F1, chess.G1)),
+     (chess.BB_A1, chess.E1, chess.C1, chess.BB_B1 | chess.BB_C1 | chess.BB_D1, (chess.D1, chess.C1))],
+]
+
+# Move objects are shared instead of being created for every generated move
+_MOVES = [[chess.Move(from_square, to_square) for to_square in chess.SQUARES] for from_square in chess.SQUARES]
+_PROMOTIONS = [[[chess.Move(from_square, to_square, promotion)
+                 for promotion in (chess.QUEEN, chess.ROOK, chess.BISHOP, chess.KNIGHT)]
+                for to_square in chess.SQUARES] for from_square in chess.SQUARES]
+_NULL_MOVE = chess.Move.null()
+
+
+def _scan(mask: int):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class SearchBoard:
+    """Compact board used inside the search.
+
+    Positions are stored as integer bitboards plus a square -> piece type
+    mailbox, and push() saves everything pop() needs in a single tuple, so
+    making and unmaking a move is much cheaper than on a chess.Board. The
+    Zobrist key and the tapered evaluation terms (mg_score, eg_score and
+    phase, from White's point of view) are updated with every move.
+
+    Only standard chess is supported. Convert with SearchBoard(board, ...)
+    at the search root and back with to_board().
+    """
+    __slots__ = ('pieces', 'occupied_co', 'occupied', 'squares', 'turn', 'castling_rights',
+                 'ep_square', 'halfmove_clock', 'fullmove_number', 'key', 'mg_score', 'eg_score',
+                 'phase', 'move_stack', 'keys', 'mg_table', 'eg_table', '_undo_stack')
+
+    def __init__(self, board: chess.Board, mg_table: List[List[List[int]]], eg_table: List[List[List[int]]]):
+        """Copy the position of board.
+
+        mg_table and eg_table are signed per-square evaluation tables indexed
+        [color][piece_type][square].
+        """
+        self.mg_table = mg_table
+        self.eg_table = eg_table
+        # Bitboards indexed by piece type (index 0 is unused) and by color
+        self.pieces = [0, board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings]
+        self.occupied_co = [board.occupied_co[chess.BLACK], board.occupied_co[chess.WHITE]]
+        self.occupied = board.occupied
+        self.squares = [board.piece_type_at(square) or 0 for square in chess.SQUARES]
+        self.turn = board.turn
+        self.castling_rights = board.clean_castling_rights()
+        # Like the Zobrist key, only keep en passant squares a pawn can capture on
+        self.ep_square = board.ep_square if ep_key(board) else None
+        self.halfmove_clock = board.halfmove_clock
+        self.fullmove_number = board.fullmove_number
+        self.key = zobrist_key(board)
+        self._undo_stack = []
+
+        self.mg_score = 0
+        self.eg_score = 0
+        self.phase = 0
+        for square, piece in board.piece_map().items():
+            self.mg_score += mg_table[piece.color][piece.piece_type][square]
+            self.eg_score += eg_table[piece.color][piece.piece_type][square]
+            self.phase += PHASE_WEIGHTS[piece.piece_type]
+
+        # Keys and moves of the game back to the last irreversible move, for repetitions
+        self.keys = [self.key]
+        history = board.copy()
+        for _ in range(min(board.halfmove_clock, len(board.move_stack))):
+            history.pop()
+            self.keys.append(zobrist_key(history))
+        self.keys.reverse()
+        self.move_stack = board.move_stack[len(board.move_stack) - len(self.keys) + 1:]
+
+    def to_board(self) -> chess.Board:
+        """Build a chess.Board with the current position (without move history)"""
+        board = chess.Board(None)
+        white = self.occupied_co[chess.WHITE]
+        for square in _scan(self.occupied):
+            board.set_piece_at(square, chess.Piece(self.squares[square], bool(white & _BB_SQUARES[square])))
+        board.turn = self.turn
+        board.castling_rights = self.castling_rights
+        board.ep_square = self.ep_square
+        board.halfmove_clock = self.halfmove_clock
+        board.fullmove_number = self.fullmove_number
+        return board
+
+    # Piece bitboards under the names chess.Board uses
+    @property
+    def pawns(self) -> int:
+        return self.pieces[chess.PAWN]
+
+    @property
+    def knights(self) -> int:
+        return self.pieces[chess.KNIGHT]
+
+    @property
+    def bishops(self) -> int:
+        return self.pieces[chess.BISHOP]
+
+    @property
+    def rooks(self) -> int:
+        return self.pieces[chess.ROOK]
+
+    @property
+    def queens(self) -> int:
+        return self.pieces[chess.QUEEN]
+
+    @property
+    def kings(self) -> int:
+        return self.pieces[chess.KING]
+
+    def piece_type_at(self, square: chess.Square) -> Optional[chess.PieceType]:
+        return self.squares[square] or None
+
+    def king(self, color: chess.Color) -> Optional[chess.Square]:
+        king_mask = self.pieces[chess.KING] & self.occupied_co[color]
+        return king_mask.bit_length() - 1 if king_mask else None
+
+    def _attackers(self, color: chess.Color, square: chess.Square, occupied: int) -> int:
+        """Pieces of color attacking square, with sliders blocked by occupied"""
+        pieces = self.pieces
+        queens = pieces[chess.QUEEN]
+        attackers = (
+            (_KNIGHT_ATTACKS[square] & pieces[chess.KNIGHT]) |
+            (_KING_ATTACKS[square] & pieces[chess.KING]) |
+            (_PAWN_ATTACKS[not color][square] & pieces[chess.PAWN]) |
+            (_DIAG_ATTACKS[square][_DIAG_MASKS[square] & occupied] & (pieces[chess.BISHOP] | queens)) |
+            ((_RANK_ATTACKS[square][_RANK_MASKS[square] & occupied] |
+              _FILE_ATTACKS[square][_FILE_MASKS[square] & occupied]) & (pieces[chess.ROOK] | queens)))
+        return attackers & self.occupied_co[color] & occupied
+
+    def attackers_mask(self, color: chess.Color, square: chess.Square) -> int:
+        return self._attackers(color, square, self.occupied)
+
+    def is_check(self) -> bool:
+        king = (self.pieces[chess.KING] & self.occupied_co[self.turn]).bit_length() - 1
+        return bool(self._attackers(not self.turn, king, self.occupied))
+
+    def is_capture(self, move: chess.Move) -> bool:
+        return bool(_BB_SQUARES[move.to_square] & self.occupied_co[not self.turn]) or self.is_en_passant(move)
+
+    def is_en_passant(self, move: chess.Move) -> bool:
+        return move.to_square == self.ep_square and self.squares[move.from_square] == chess.PAWN
+
+    def is_legal(self, move: chess.Move) -> bool:
+        return bool(move) and move in self.generate_legal_moves(_BB_SQUARES[move.from_square],
+                                                                _BB_SQUARES[move.to_square])
+
+    @property
+    def legal_moves(self) -> List[chess.Move]:
+        return self.generate_legal_moves()
+
+    def generate_legal_captures(self) -> List[chess.Move]:
+        """Legal captures, including en passant and capturing promotions"""
+        moves = self.generate_legal_moves(chess.BB_ALL, self.occupied_co[not self.turn])
+        if self.ep_square is not None:
+            moves += self.generate_legal_moves(self.pieces[chess.PAWN], _BB_SQUARES[self.ep_square])
+        return moves
+
+    def generate_legal_moves(self, from_mask: int = chess.BB_ALL, to_mask: int = chess.BB_ALL) -> List[chess.Move]:
+        """Legal moves from a square in from_mask to a square in to_mask"""
+        us = self.turn
+        them = not us
+        pieces = self.pieces
+        squares = self.squares
+        occupied = self.occupied
+        ours = self.occupied_co[us]
+        theirs = self.occupied_co[them]
+        king_bb = pieces[chess.KING] & ours
+        king = king_bb.bit_length() - 1
+        moves = []
+        append = moves.append
+
+        # King moves: the target must not be attacked once the king has left its square
+        if king_bb & from_mask:
+            king_moves = _MOVES[king]
+            without_king = occupied ^ king_bb
+            targets = _KING_ATTACKS[king] & ~ours & to_mask
+            while targets:
+                to_bb = targets & -targets
+                targets ^= to_bb
+                to_square = to_bb.bit_length() - 1
+                if not self._attackers(them, to_square, without_king):
+                    append(king_moves[to_square])
+
+        checkers = self._attackers(them, king, occupied)
+        if checkers:
+            if checkers & (checkers - 1):
+                return moves  # double check: only the king can move
+            # Capture the checking piece or block the line to the king
+            target = (_BETWEEN[king][checkers.bit_length() - 1] | checkers) & to_mask
+        else:
+            target = ~ours & to_mask
+            if king_bb & from_mask and self.castling_rights:
+                for right, king_from, king_to, empty, crossed in _CASTLING_MOVES[us]:
+                    if (self.castling_rights & right and not occupied & empty
+                            and _BB_SQUARES[king_to] & to_mask
+                            and not self._attackers(them, crossed[0], occupied)
+                            and not self._attackers(them, crossed[1], occupied)):
+                        append(_MOVES[king_from][king_to])
+
+        # Pinned pieces may only move along the line through the king
+        pinned = 0
+        queens = pieces[chess.QUEEN]
+        snipers = ((_RANK_ATTACKS[king][0] | _FILE_ATTACKS[king][0]) & (pieces[chess.ROOK] | queens)
+                   | _DIAG_ATTACKS[king][0] & (pieces[chess.BISHOP] | queens)) & theirs
+        while snipers:
+            sniper_bb = snipers & -snipers
+            snipers ^= sniper_bb
+            blockers = _BETWEEN[king][sniper_bb.bit_length() - 1] & occupied
+            if blockers and not blockers & (blockers - 1):
+                pinned |= blockers & ours
+        line = _LINE[king]
+
+        # Knights, bishops, rooks and queens; a pinned knight can never move
+        movers = ours & ~pieces[chess.PAWN] & ~king_bb & from_mask & ~(pinned & pieces[chess.KNIGHT])
+        while movers:
+            from_bb = movers & -movers
+            movers ^= from_bb
+            from_square = from_bb.bit_length() - 1
+            piece_type = squares[from_square]
+            if piece_type == chess.KNIGHT:
+                attacks = _KNIGHT_ATTACKS[from_square] & target
+            else:
+                if piece_type == chess.BISHOP:
+                    attacks = _DIAG_ATTACKS[from_square][_DIAG_MASKS[from_square] & occupied]
+                elif piece_type == chess.ROOK:
+                    attacks = (_RANK_ATTACKS[from_square][_RANK_MASKS[from_square] & occupied] |
+                               _FILE_ATTACKS[from_square][_FILE_MASKS[from_square] & occupied])
+                else:
+                    attacks = (_DIAG_ATTACKS[from_square][_DIAG_MASKS[from_square] & occupied] |
+                               _RANK_ATTACKS[from_square][_RANK_MASKS[from_square] & occupied] |
+                               _FILE_ATTACKS[from_square][_FILE_MASKS[from_square] & occupied])
+                attacks &= target
+                if from_bb & pinned:
+                    attacks &= line[from_square]
+            from_moves = _MOVES[from_square]
+            while attacks:
+                to_bb = attacks & -attacks
+                attacks ^= to_bb
+                append(from_moves[to_bb.bit_length() - 1])
+
+        # Pawn captures and pushes
+        pawns = pieces[chess.PAWN] & ours & from_mask
+        if pawns:
+            pawn_attacks = _PAWN_ATTACKS[us]
+            capturers = pawns
+            capture_targets = theirs & target
+            while capturers:
+                from_bb = capturers & -capturers
+                capturers ^= from_bb
+                from_square = from_bb.bit_length() - 1
+                targets = pawn_attacks[from_square] & capture_targets
+                if targets and from_bb & pinned:
+                    targets &= line[from_square]
+                while targets:
+                    to_bb = targets & -targets
+                    targets ^= to_bb
+                    if to_bb & _BACK_RANKS:
+                        moves.extend(_PROMOTIONS[from_square][to_bb.bit_length() - 1])
+                    else:
+                        append(_MOVES[from_square][to_bb.bit_length() - 1])
+
+            empty = ~occupied
+            if us:
+                single = (pawns << 8) & empty
+                double = ((single & chess.BB_RANK_3) << 8) & empty & target
+                forward = -8
+            else:
+                single = (pawns >> 8) & empty
+                double = ((single & chess.BB_RANK_6) >> 8) & empty & target
+                forward = 8
+            single &= target
+            while single:
+                to_bb = single & -single
+                single ^= to_bb
+                to_square = to_bb.bit_length() - 1
+                from_square = to_square + forward
+                if _BB_SQUARES[from_square] & pinned and not line[from_square] & to_bb:
+                    continue
+                if to_bb & _BACK_RANKS:
+                    moves.extend(_PROMOTIONS[from_square][to_square])
+                else:
+                    append(_MOVES[from_square][to_square])
+            while double:
+                to_bb = double & -double
+                double ^= to_bb
+                to_square = to_bb.bit_length() - 1
+                from_square = to_square + 2 * forward
+                if _BB_SQUARES[from_square] & pinned and not line[from_square] & to_bb:
+                    continue
+                append(_MOVES[from_square][to_square])
+
+            # En passant: check the king directly, since two pieces leave the capturing rank
+            ep_square = self.ep_square
+            if ep_square is not None and _BB_SQUARES[ep_square] & to_mask:
+                captured_bb = _BB_SQUARES[ep_square + forward]
+                for from_square in _scan(_PAWN_ATTACKS[them][ep_square] & pawns):
+                    after = (occupied ^ _BB_SQUARES[from_square] ^ captured_bb) | _BB_SQUARES[ep_square]
+                    if not self._attackers(them, king, after):
+                        append(_MOVES[from_square][ep_square])
+
+        return moves
+
+    def push(self, move: chess.Move):
+        """Make a legal move"""
+        us = self.turn
+        them = not us
+        from_square = move.from_square
+        to_square = move.to_square
+        squares = self.squares
+        pieces = self.pieces
+        occupied_co = self.occupied_co
+        piece_type = squares[from_square]
+        captured = squares[to_square]
+        castling_rights = self.castling_rights
+        ep_square = self.ep_square
+        key = self.key
+        mg = self.mg_score
+        eg = self.eg_score
+        phase = self.phase
+        self._undo_stack.append((captured, castling_rights, ep_square, self.halfmove_clock, key, mg, eg, phase))
+        self.move_stack.append(move)
+
+        mg_us = self.mg_table[us]
+        eg_us = self.eg_table[us]
+        keys_us = PIECE_KEYS[us]
+        from_bb = _BB_SQUARES[from_square]
+        to_bb = _BB_SQUARES[to_square]
+        key ^= TURN_KEY ^ castling_key(castling_rights)
+        if ep_square is not None:
+            key ^= _EP_KEYS[ep_square & 7]
+
+        # Lift the moving piece
+        pieces[piece_type] ^= from_bb
+        occupied_co[us] ^= from_bb
+        squares[from_square] = 0
+        key ^= keys_us[piece_type][from_square]
+        mg -= mg_us[piece_type][from_square]
+        eg -= eg_us[piece_type][from_square]
+
+        if captured:
+            pieces[captured] ^= to_bb
+            occupied_co[them] ^= to_bb
+            key ^= PIECE_KEYS[them][captured][to_square]
+            mg -= self.mg_table[them][captured][to_square]
+            eg -= self.eg_table[them][captured][to_square]
+            phase -= PHASE_WEIGHTS[captured]
+
+        new_type = piece_type
+        new_ep_square = None
+        self.halfmove_clock = 0 if captured or piece_type == chess.PAWN else self.halfmove_clock + 1
+        if piece_type == chess.PAWN:
+            if move.promotion:
+                new_type = move.promotion
+                phase += PHASE_WEIGHTS[new_type]
+            elif to_square == ep_square:
+                # En passant: the captured pawn is behind the target square
+                captured_square = to_square - 8 if us else to_square + 8
+                captured_bb = _BB_SQUARES[captured_square]
+                pieces[chess.PAWN] ^= captured_bb
+                occupied_co[them] ^= captured_bb
+                squares[captured_square] = 0
+                key ^= PIECE_KEYS[them][chess.PAWN][captured_square]
+                mg -= self.mg_table[them][chess.PAWN][captured_square]
+                eg -= self.eg_table[them][chess.PAWN][captured_square]
+            elif to_square - from_square in (16, -16):
+                skipped = (from_square + to_square) >> 1
+                if _PAWN_ATTACKS[us][skipped] & pieces[chess.PAWN] & occupied_co[them]:
+                    new_ep_square = skipped
+                    key ^= _EP_KEYS[skipped & 7]
+        elif piece_type == chess.KING and to_square - from_square in (2, -2):
+            # Castling: the rook jumps over the king
+            if to_square > from_square:
+                rook_from, rook_to = to_square + 1, to_square - 1
+            else:
+                rook_from, rook_to = to_square - 2, to_square + 1
+            rook_bb = _BB_SQUARES[rook_from] | _BB_SQUARES[rook_to]
+            pieces[chess.ROOK] ^= rook_bb
+            occupied_co[us] ^= rook_bb
+            squares[rook_from] = 0
+            squares[rook_to] = chess.ROOK
+            key ^= keys_us[chess.ROOK][rook_from] ^ keys_us[chess.ROOK][rook_to]
+            mg += mg_us[chess.ROOK][rook_to] - mg_us[chess.ROOK][rook_from]
+            eg += eg_us[chess.ROOK][rook_to] - eg_us[chess.ROOK][rook_from]
+
+        # Put it down on the target square
+        pieces[new_type] |= to_bb
+        occupied_co[us] |= to_bb
+        squares[to_square] = new_type
+        key ^= keys_us[new_type][to_square]
+        mg += mg_us[new_type][to_square]
+        eg += eg_us[new_type][to_square]
+
+        castling_rights &= _CASTLING_KEEP[from_square] & _CASTLING_KEEP[to_square]
+        self.castling_rights = castling_rights
+        key ^= castling_key(castling_rights)
+
+        self.occupied = occupied_co[0] | occupied_co[1]
+        self.ep_square = new_ep_square
+        self.turn = them
+        if not us:
+            self.fullmove_number += 1
+        self.key = key
+        self.keys.append(key)
+        self.mg_score = mg
+        self.eg_score = eg
+        self.phase = phase
+
+    def push_null(self):
+        """Pass the turn to the opponent"""
+        self._undo_stack.append((0, self.castling_rights, self.ep_square, self.halfmove_clock,
+                                 self.key, self.mg_score, self.eg_score, self.phase))
+        self.move_stack.append(_NULL_MOVE)
+        self.key ^= TURN_KEY
+        if self.ep_square is not None:
+            self.key ^= _EP_KEYS[self.ep_square & 7]
+            self.ep_square = None
+        self.halfmove_clock += 1
+        if not self.turn:
+            self.fullmove_number += 1
+        self.turn = not self.turn
+        self.keys.append(self.key)
+
+    def pop(self) -> chess.Move:
+        """Unmake the last move pushed since the conversion from chess.Board"""
+        move = self.move_stack.pop()
+        (captured, self.castling_rights, ep_square, self.halfmove_clock,
+         self.key, self.mg_score, self.eg_score, self.phase) = self._undo_stack.pop()
+        self.keys.pop()
+        self.ep_square = ep_square
+        us = not self.turn
+        self.turn = us
+        if not us:
+            self.fullmove_number -= 1
+        if not move:
+            return move
+
+        them = not us
+        from_square = move.from_square
+        to_square = move.to_square
+        squares = self.squares
+        pieces = self.pieces
+        occupied_co = self.occupied_co
+        from_bb = _BB_SQUARES[from_square]
+        to_bb = _BB_SQUARES[to_square]
+        new_type = squares[to_square]
+        piece_type = chess.PAWN if move.promotion else new_type
+
+        pieces[new_type] ^= to_bb
+        pieces[piece_type] |= from_bb
+        occupied_co[us] ^= to_bb | from_bb
+        squares[from_square] = piece_type
+        squares[to_square] = captured
+        if captured:
+            pieces[captured] |= to_bb
+            occupied_co[them] |= to_bb
+        elif piece_type == chess.PAWN and to_square == ep_square:
+            captured_square = to_square - 8 if us else to_square + 8
+            captured_bb = _BB_SQUARES[captured_square]
+            pieces[chess.PAWN] |= captured_bb
+            occupied_co[them] |= captured_bb
+            squares[captured_square] = chess.PAWN
+        elif piece_type == chess.KING and to_square - from_square in (2, -2):
+            if to_square > from_square:
+                rook_from, rook_to = to_square + 1, to_square - 1
+            else:
+                rook_from, rook_to = to_square - 2, to_square + 1
+            rook_bb = _BB_SQUARES[rook_from] | _BB_SQUARES[rook_to]
+            pieces[chess.ROOK] ^= rook_bb
+            occupied_co[us] ^= rook_bb
+            squares[rook_to] = 0
+            squares[rook_from] = chess.ROOK
+        self.occupied = occupied_co[0] | occupied_co[1]
+        return move
+
+
+def perft(board: SearchBoard, depth: int) -> int:
+    """Count the leaf nodes of the legal move tree to the given depth"""
+    if depth <= 0:
+        return 1
+    moves = board.generate_legal_moves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        board.push(move)
+        nodes += perft(board, depth - 1)
+        board.pop()
+    return nodes
@@ -0,0 +1,73 @@
+import chess
+from typing import Dict
+
+
+def attackers_to(board: chess.Board, square: chess.Square, occupied: int) -> int:
+    """Pieces of both colors attacking square, given a custom occupancy.
+
+    Sliders are computed against occupied, so removing a piece from it reveals
+    the x-ray attackers standing behind it.
+    """
+    rank_pieces = chess.BB_RANK_MASKS[square] & occupied
+    file_pieces = chess.BB_FILE_MASKS[square] & occupied
+    diag_pieces = chess.BB_DIAG_MASKS[square] & occupied
+    queens_and_rooks = board.queens | board.rooks
+    queens_and_bishops = board.queens | board.bishops
+    attackers = (
+        (chess.BB_KING_ATTACKS[square] & board.kings) |
+        (chess.BB_KNIGHT_ATTACKS[square] & board.knights) |
+        (chess.BB_RANK_ATTACKS[square][rank_pieces] & queens_and_rooks) |
+        (chess.BB_FILE_ATTACKS[square][file_pieces] & queens_and_rooks) |
+        (chess.BB_DIAG_ATTACKS[square][diag_pieces] & queens_and_bishops) |
+        (chess.BB_PAWN_ATTACKS[chess.BLACK][square] & board.pawns & board.occupied_co[chess.WHITE]) |
+        (chess.BB_PAWN_ATTACKS[chess.WHITE][square] & board.pawns & board.occupied_co[chess.BLACK]))
+    return attackers & occupied
+
+
+def _least_valuable_attacker(board: chess.Board, attackers: int):
+    for piece_type, mask in ((chess.PAWN, board.pawns), (chess.KNIGHT, board.knights),
+                             (chess.BISHOP, board.bishops), (chess.ROOK, board.rooks),
+                             (chess.QUEEN, board.queens), (chess.KING, board.kings)):
+        if attackers & mask:
+            return piece_type, chess.lsb(attackers & mask)
+    return None, None
+
+
+def static_exchange_evaluation(board: chess.Board, move: chess.Move, piece_values: Dict[int, int]) -> int:
+    """Material balance of the capture sequence on move's target square.
+
+    Both sides keep recapturing with their least valuable attacker and may stop
+    whenever continuing would lose material. Pins are ignored.
+    """
+    from_square = move.from_square
+    to_square = move.to_square
+    occupied = board.occupied ^ chess.BB_SQUARES[from_square]
+
+    victim = board.piece_type_at(to_square)
+    if victim is None and board.is_en_passant(move):
+        victim = chess.PAWN
+        occupied ^= chess.BB_SQUARES[to_square - 8 if board.turn else to_square + 8]
+    attacker = move.promotion or board.piece_type_at(from_square)
+
+    gains = [piece_values[victim] if victim else 0]
+    if move.promotion:
+        gains[0] += piece_values[move.promotion] - piece_values[chess.PAWN]
+    value_on_square = piece_values[attacker]
+    color = not board.turn
+
+    while True:
+        attackers = attackers_to(board, to_square, occupied) & board.occupied_co[color]
+        if not attackers:
+            break
+        piece_type, square = _least_valuable_attacker(board, attackers)
+        if piece_type == chess.KING and attackers_to(board, to_square, occupied) & board.occupied_co[not color]:
+            break  # the king can't capture into a defended square
+        gains.append(value_on_square - gains[-1])
+        value_on_square = piece_values[piece_type]
+        occupied ^= chess.BB_SQUARES[square]
+        color = not color
+
+    # Propagate the best stopping decision back to the first capture
+    for i in range(len(gains) - 1, 0, -1):
+        gains[i - 1] = -max(-gains[i - 1], gains[i])
+    return gains[0]
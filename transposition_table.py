@@ -0,0 +1,130 @@
+from array import array
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+import chess
+
+# Bound types
+BOUND_NONE = 0
+BOUND_LOWER = 1
+BOUND_UPPER = 2
+BOUND_EXACT = 3
+
+# Each bucket holds two entries of two 64-bit words (key ^ data, data):
+# slot 0 is depth-preferred, slot 1 is always-replace. Storing the key XORed
+# with the data lets processes share the table without locks: an entry torn
+# by concurrent writes fails the key check and is treated as a miss.
+BUCKET_BYTES = 32
+
+_SCORE_OFFSET = 1 << 23
+
+
+def encode_move(move: Optional[chess.Move]) -> int:
+    if move is None:
+        return 0
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def decode_move(code: int) -> Optional[chess.Move]:
+    if not code:
+        return None
+    return chess.Move(code & 0x3F, (code >> 6) & 0x3F, (code >> 12) or None)
+
+
+class TranspositionTable:
+    def __init__(self, size_mb: int = 16, shared: bool = False, name: Optional[str] = None):
+        """Create a table of at most size_mb megabytes.
+
+        With shared=True the table lives in a new shared memory block; pass its
+        name to attach to an existing block from another process.
+        """
+        self.size_mb = size_mb
+        # Largest power of two number of buckets that fits the budget
+        num_buckets = 1
+        while num_buckets * 2 * BUCKET_BYTES <= size_mb * 1024 * 1024:
+            num_buckets *= 2
+        self.num_buckets = num_buckets
+        self.mask = num_buckets - 1
+        self.generation = 0
+        
+        self.shm = None
+        self.owner = False
+        if shared or name:
+            size = num_buckets * BUCKET_BYTES
+            self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+            self.owner = name is None
+            self.table = self.shm.buf[:size].cast('Q')
+        else:
+            self.table = array('Q', bytes(num_buckets * BUCKET_BYTES))
+
+    @property
+    def name(self) -> Optional[str]:
+        """Name of the shared memory block, if the table is shared"""
+        return self.shm.name if self.shm else None
+
+    def close(self):
+        """Release the shared memory block (and remove it if this table created it)"""
+        if self.shm:
+            self.table.release()
+            self.shm.close()
+            if self.owner:
+                self.shm.unlink()
+            self.shm = None
+
+    def clear(self):
+        """Wipe all entries"""
+        if self.shm:
+            self.shm.buf[:self.num_buckets * BUCKET_BYTES] = bytes(self.num_buckets * BUCKET_BYTES)
+        else:
+            self.table = array('Q', bytes(self.num_buckets * BUCKET_BYTES))
+        self.generation = 0
+
+    def new_search(self):
+        """Start a new search; entries from older searches become replaceable"""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def probe(self, key: int) -> Optional[Tuple[int, int, int, Optional[chess.Move]]]:
+        """Look up a position, returning (depth, score, bound, move) or None"""
+        table = self.table
+        index = (key & self.mask) << 2
+        data = table[index + 1]
+        if table[index] ^ data != key:
+            data = table[index + 3]
+            if table[index + 2] ^ data != key:
+                return None
+        bound = (data >> 48) & 0x3
+        if bound == BOUND_NONE:
+            return None
+        score = ((data >> 16) & 0xFFFFFF) - _SCORE_OFFSET
+        return (data >> 40) & 0xFF, score, bound, decode_move(data & 0xFFFF)
+
+    def store(self, key: int, depth: int, score: int, bound: int, move: Optional[chess.Move]):
+        """Store a search result, replacing by depth in slot 0 and always in slot 1"""
+        data = (encode_move(move)
+                | ((int(score) + _SCORE_OFFSET) << 16)
+                | (max(0, min(depth, 0xFF)) << 40)
+                | (bound << 48)
+                | (self.generation << 50))
+        table = self.table
+        index = (key & self.mask) << 2
+        old = table[index + 1]
+        if (table[index] ^ old == key
+                or not old
+                or depth >= (old >> 40) & 0xFF
+                or (old >> 50) & 0xFF != self.generation):
+            table[index] = key ^ data
+            table[index + 1] = data
+        else:
+            table[index + 2] = key ^ data
+            table[index + 3] = data
+
+    def hashfull(self) -> int:
+        """Permille of sampled entries written during the current search"""
+        table = self.table
+        sample = min(self.num_buckets, 500)
+        used = 0
+        for bucket in range(sample):
+            for slot in (1, 3):
+                data = table[(bucket << 2) + slot]
+                if data and (data >> 50) & 0xFF == self.generation:
+                    used += 1
+        return used * 1000 // (sample * 2)
@@ -0,0 +1,50 @@
+import chess
+import chess.polyglot
+
+# Use the Polyglot random numbers so search keys match opening book keys
+_RANDOM = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+
+# PIECE_KEYS[color][piece_type][square]
+PIECE_KEYS = [
+    [[0] * 64] + [[_RANDOM[64 * ((piece_type - 1) * 2 + color) + square] for square in chess.SQUARES]
+                  for piece_type in chess.PIECE_TYPES]
+    for color in (chess.BLACK, chess.WHITE)
+]
+
+TURN_KEY = _RANDOM[780]
+
+_CASTLING_SQUARES = [(chess.BB_H1, 768), (chess.BB_A1, 769), (chess.BB_H8, 770), (chess.BB_A8, 771)]
+_castling_cache = {}
+
+
+def castling_key(castling_rights: int) -> int:
+    """Get the key for a castling rights bitmask"""
+    key = _castling_cache.get(castling_rights)
+    if key is None:
+        key = 0
+        for mask, index in _CASTLING_SQUARES:
+            if castling_rights & mask:
+                key ^= _RANDOM[index]
+        _castling_cache[castling_rights] = key
+    return key
+
+
+def ep_key(board: chess.Board) -> int:
+    """Get the en passant key (only set when a pawn can actually capture, as in Polyglot)"""
+    ep_square = board.ep_square
+    if ep_square is None:
+        return 0
+    if board.turn:
+        ep_mask = chess.shift_down(chess.BB_SQUARES[ep_square])
+    else:
+        ep_mask = chess.shift_up(chess.BB_SQUARES[ep_square])
+    ep_mask = chess.shift_left(ep_mask) | chess.shift_right(ep_mask)
+    if ep_mask & board.pawns & board.occupied_co[board.turn]:
+        return _RANDOM[772 + chess.square_file(ep_square)]
+    return 0
+
+
+def zobrist_key(board: chess.Board) -> int:
+    """Compute the full key of a position from scratch"""
+    return chess.polyglot.zobrist_hash(board)
+